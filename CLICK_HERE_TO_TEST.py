@@ -6,7 +6,7 @@ Just run this file to test the system yourself!
 
 import sys
 sys.path.append('/home/yethatsjames/community-ai-workspace/scripts')
-from privacy_rag import CommunityRAG
+from mapped_rag import open_knowledge_base
 
 print("🏘️  COMMUNITY DATA COMMONS - INTERACTIVE TEST")
 print("=" * 50)
@@ -14,7 +14,7 @@ print()
 
 # Initialize the system
 print("Loading your community knowledge base...")
-rag = CommunityRAG()
+rag = open_knowledge_base()
 print(f"✅ Ready! {rag.collection.count()} community insights loaded")
 print()
 
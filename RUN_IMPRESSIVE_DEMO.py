@@ -26,8 +26,8 @@ def main():
     
     big_text("LOADING AI KNOWLEDGE BASE")
     
-    from privacy_rag import CommunityRAG
-    rag = CommunityRAG()
+    from mapped_rag import open_knowledge_base
+    rag = open_knowledge_base()
     
     print(f"\n🧠 AI PROCESSING COMPLETE!")
     print(f"📊 {rag.collection.count()} COMMUNITY INSIGHTS EXTRACTED")
@@ -42,9 +42,11 @@ def main():
         "How do communities engage government?"
     ]
     
-    for query in test_queries:
+    # One embedding batch and one vector search for every test query
+    all_results = rag.query_many(test_queries, n_results=1)
+    
+    for query, results in zip(test_queries, all_results):
         print(f"\n🔍 TESTING: {query}")
-        results = rag.query_knowledge_base(query, n_results=1)
         top_result = results['results'][0]
         similarity = top_result['similarity']
         content = top_result['content'][:100]
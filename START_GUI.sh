@@ -12,4 +12,13 @@ echo "🔥 Starting in 3 seconds..."
 sleep 3
 
 cd /home/yethatsjames/community-ai-workspace
+# One shared embedding model for every process serving the mapped export (no-op if it's
+# already running). Serving Chroma, CommunityRAG keeps its own model, so no server then
+mkdir -p run
+if python3 embedding_server.py needed; then
+    python3 embedding_server.py serve > run/embedding_server.log 2>&1 &
+    # Apps check for the server once, when their engine is built - start them after it is up
+    python3 embedding_server.py wait 120 || echo "⚠️ Embedding server not ready - the GUI will load its own model"
+fi
+
 streamlit run community_gui.py --server.port 8501 --server.address localhost
\ No newline at end of file
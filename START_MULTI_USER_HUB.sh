@@ -15,6 +15,9 @@ sleep 3
 
 cd /home/yethatsjames/community-ai-workspace
 
+# No embedding server here: the hub's insights engine is CommunityRAG, which loads its own
+# model, so a server would be an extra copy. START_GUI.sh starts one when the GUI can use it
+
 # Start with network access enabled
 streamlit run community_action_hub.py \
     --server.port 8502 \
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+📈 COMMUNITY DATA COMMONS - ANALYTICS JOBS
+Corpus statistics computed across a process pool, cached by collection version
+"""
+
+import os
+import json
+import time
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from theme_counter import THEMES, ThemeMatcher
+from vector_index import iter_collection
+
+WORKSPACE_PATH = Path("/home/yethatsjames/community-ai-workspace")
+ANALYTICS_CACHE_FILE = WORKSPACE_PATH / "vector-db" / "analytics.json"
+IMPACT_FILE = WORKSPACE_PATH / "impact-demonstration.json"
+
+# Below this many chunks, starting worker processes costs more than it saves
+PARALLEL_MIN_CHUNKS = 20_000
+
+_matcher = None
+
+
+def _init_worker(themes):
+    global _matcher
+    _matcher = ThemeMatcher(themes)
+
+
+def count_shard(documents, metadatas):
+    """Partial counters for one page of chunks; documents=None skips theme matching"""
+    communities = Counter()
+    participants = set()
+    for metadata in metadatas:
+        metadata = metadata or {}
+        community = metadata.get('community') or 'Unknown'
+        communities[community] += 1
+        if metadata.get('participant_id'):
+            participants.add((community, metadata['participant_id']))
+    keywords = Counter()
+    for document in documents or ():
+        keywords.update(_matcher.keywords_in(document or ''))
+    return {'chunks': len(metadatas), 'communities': communities, 'participants': participants,
+            'keywords': keywords}
+
+
+def merge_shards(shards, themes=THEMES):
+    """Fold partial counters into the statistics the analytics page and impact report show"""
+    matcher = ThemeMatcher(themes)
+    chunks, communities, participants, keywords = 0, Counter(), set(), Counter()
+    for shard in shards:
+        chunks += shard['chunks']
+        communities.update(shard['communities'])
+        participants |= shard['participants']
+        keywords.update(shard['keywords'])
+    theme_counts = dict.fromkeys(matcher.themes, 0)
+    for keyword, count in keywords.items():
+        for theme in matcher.keyword_themes[keyword]:
+            theme_counts[theme] += count
+    community_participants = Counter(community for community, _ in participants)
+    return {
+        'documents': chunks,
+        'communities': dict(communities.most_common()),
+        'participants': len(participants),
+        'community_participants': dict(community_participants.most_common()),
+        'themes': theme_counts,
+    }
+
+
+def count_corpus(pages, workers=None, themes=THEMES, total=None):
+    """Statistics over an iterable of get() pages, sharded across worker processes
+
+    Pages are handed out as they are read, with at most two per worker in
+    flight, so memory stays bounded by the page size rather than the corpus.
+    Small corpora (total under PARALLEL_MIN_CHUNKS) are counted in-process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or (total is not None and total < PARALLEL_MIN_CHUNKS):
+        _init_worker(themes)
+        return merge_shards((count_shard(page.get('documents'), page['metadatas']) for page in pages), themes)
+
+    shards, pending = [], set()
+    # spawn: forking a multi-threaded server process can deadlock the children
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(themes,)) as pool:
+        for page in pages:
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                shards.extend(future.result() for future in done)
+            pending.add(pool.submit(count_shard, page.get('documents'), page['metadatas']))
+        shards.extend(future.result() for future in pending)
+    return merge_shards(shards, themes)
+
+
+def corpus_statistics(rag, workers=None, batch_size=2000):
+    """Community, participant and theme statistics for the knowledge base as it is now
+
+    When the ingest-time theme index is in step with the collection, themes
+    and communities come from it and the workers only read metadata.
+    """
+    collection = rag.collection
+    total = collection.count()
+    theme_index = getattr(rag, 'theme_index', None)
+    if theme_index is not None and theme_index.count() == total:
+        stats = count_corpus(iter_collection(collection, batch_size, ('metadatas',)), workers, total=total)
+        stats['themes'] = theme_index.theme_counts()
+        stats['communities'] = theme_index.community_counts()
+        return stats
+    return count_corpus(iter_collection(collection, batch_size), workers, total=total)
+
+
+class AnalyticsRunner:
+    """Serves the last computed statistics at once and recomputes them in the background
+
+    latest() returns (stats, fresh). Results are stored with the collection
+    version they were computed for, in memory and in ANALYTICS_CACHE_FILE, so
+    a restarted server has numbers to show before its first refresh. When the
+    version has moved on, latest() returns the previous results with fresh
+    False and starts one background refresh; concurrent callers share it.
+    """
+
+    def __init__(self, cache_file=ANALYTICS_CACHE_FILE, workers=None, batch_size=2000):
+        self.cache_file = Path(cache_file)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.error = None
+        self._lock = threading.Lock()
+        self._refresh = None
+        self._cached = self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, cached):
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.cache_file.with_suffix('.tmp')
+        with open(temporary, 'w') as f:
+            json.dump(cached, f)
+        temporary.replace(self.cache_file)
+
+    def refresh(self, rag):
+        """Recompute the statistics now, on the calling thread"""
+        version = list(rag.collection_version())
+        start = time.perf_counter()
+        stats = corpus_statistics(rag, self.workers, self.batch_size)
+        cached = {'collection_version': version, 'computed_at': time.time(),
+                  'seconds': time.perf_counter() - start, 'stats': stats}
+        self._cached = cached
+        self._store(cached)
+        theme_index = getattr(rag, 'theme_index', None)
+        if theme_index is not None:
+            # Bring the index back in step so the next refresh can skip theme matching
+            theme_index.sync(rag.collection)
+        return stats
+
+    def _run(self, rag):
+        try:
+            self.refresh(rag)
+            self.error = None
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Analytics refresh failed: {self.error}")
+
+    def latest(self, rag):
+        """(statistics or None, True if they match the current collection version)"""
+        cached = self._cached
+        if cached is not None and cached['collection_version'] == list(rag.collection_version()):
+            return cached['stats'], True
+        with self._lock:
+            if self._refresh is None or not self._refresh.is_alive():
+                self._refresh = threading.Thread(target=self._run, args=(rag,), name="analytics-refresh",
+                                                 daemon=True)
+                self._refresh.start()
+        return (cached['stats'] if cached else None), False
+
+    @property
+    def refreshing(self):
+        return self._refresh is not None and self._refresh.is_alive()
+
+    def wait(self, timeout=None):
+        """Block until the running refresh (if any) finishes"""
+        if self._refresh is not None:
+            self._refresh.join(timeout)
+        return not self.refreshing
+
+    @property
+    def computed_at(self):
+        return self._cached['computed_at'] if self._cached else None
+
+
+def impact_report(stats):
+    """The impact-demonstration.json layout, from corpus statistics"""
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'participants_protected': stats['participants'],
+        'themes_extracted': stats['themes'],
+        'impact_metrics': {
+            'documents': stats['documents'],
+            'communities': len(stats['communities']),
+            'participants': stats['participants'],
+            'privacy_level': "100% Local",
+            'federated_ready': True,
+            'movement_ready': True,
+        },
+        'demonstration_complete': True,
+    }
+
+
+if __name__ == "__main__":
+    # python analytics_jobs.py [benchmark [chunks] | report]
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'benchmark'
+
+    if command == 'report':
+        from mapped_rag import open_knowledge_base
+        stats = AnalyticsRunner().refresh(open_knowledge_base())
+        with open(IMPACT_FILE, 'w') as f:
+            json.dump(impact_report(stats), f, indent=2)
+        print(f"📈 {stats['documents']:,} chunks, {len(stats['communities'])} communities, "
+              f"{stats['participants']} participants -> {IMPACT_FILE}")
+
+    elif command == 'benchmark':
+        # Single process vs the worker pool over a synthetic corpus
+        from theme_counter import synthetic_documents
+
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+        documents = synthetic_documents(n)
+        metadatas = [{'community': f"Community {i % 12}", 'participant_id': f"p{i % 600}"} for i in range(n)]
+        pages = [{'documents': documents[i:i + 2000], 'metadatas': metadatas[i:i + 2000]} for i in range(0, n, 2000)]
+
+        print("📈 ANALYTICS JOB BENCHMARK")
+        print("=" * 50)
+        print(f"📝 {n:,} chunks on {os.cpu_count()} CPUs")
+        start = time.perf_counter()
+        single = count_corpus(pages, workers=1)
+        single_time = time.perf_counter() - start
+        print(f"🐢 one process:        {single_time:6.2f}s")
+        for workers in sorted({2, 4, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            pooled = count_corpus(pages, workers=workers, total=n)
+            pooled_time = time.perf_counter() - start
+            print(f"⚡ {workers:2d} worker processes: {pooled_time:6.2f}s, {single_time / pooled_time:4.1f}x, "
+                  f"{'identical' if pooled == single else 'DIFFERENT'} statistics")
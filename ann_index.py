@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+🧭 COMMUNITY DATA COMMONS - APPROXIMATE NEAREST NEIGHBOURS
+Inverted-file (IVF) search over the flat vector index for large corpora
+"""
+
+import os
+import json
+import time
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from vector_index import QuantizedVectorIndex, _normalize, _top_k, new_version, publish_version
+
+IVF_DIR = "ivf"
+BACKENDS = ('auto', 'flat', 'ivf')
+# Below this a flat scan takes about a millisecond and needs no training
+IVF_MIN_ROWS = 10000
+
+
+def default_nlist(count):
+    """About sqrt(n) lists: a few hundred rows each for 10k-1M chunks"""
+    return max(1, min(count, int(round(np.sqrt(count)))))
+
+
+def _assign(vectors, centroids, block_rows=8192):
+    """Index of the most similar centroid for every row"""
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block_rows):
+        block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(vectors, nlist, iterations=10, seed=0):
+    """Unit-length centroids for cosine similarity; empty lists are re-seeded"""
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        empty = np.flatnonzero(np.bincount(labels, minlength=nlist) == 0)
+        sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class IVFIndex(QuantizedVectorIndex):
+    """QuantizedVectorIndex that only scans the lists nearest the query
+
+    Rows are partitioned around nlist k-means centroids when the index is
+    trained. A search scores the centroids, scans the quantized codes of the
+    nprobe best lists and re-scores the top k * rerank candidates exactly, as
+    the flat index does. nprobe trades latency for recall at query time; nlist
+    is fixed at training time. The partition lives next to the flat files, in
+    the same version directory (see QuantizedVectorIndex):
+
+        ivf/centroids.f32    nlist x dim unit vectors
+        ivf/list_offsets.i64 start of each list in list_rows, nlist + 1
+        ivf/list_rows.i64    row numbers grouped by list, ascending within a list
+        ivf/codes.q          the quantized codes in list_rows order, so each
+                             probed list is one contiguous read
+        ivf/manifest.json    nlist and the row count it was trained on
+    """
+
+    def __init__(self, index_dir, nprobe=16):
+        super().__init__(index_dir)
+        ivf_dir = self.index_dir / IVF_DIR
+        with open(ivf_dir / "manifest.json") as f:
+            self.ivf_manifest = json.load(f)
+        if self.ivf_manifest['count'] != len(self.ids):
+            raise ValueError(f"IVF partition in {ivf_dir} is stale; retrain it")
+        self.centroids = np.fromfile(ivf_dir / "centroids.f32", dtype=np.float32).reshape(-1, self.manifest['dim'])
+        self.list_offsets = np.fromfile(ivf_dir / "list_offsets.i64", dtype=np.int64)
+        self.list_rows = np.memmap(ivf_dir / "list_rows.i64", dtype=np.int64, mode='r')
+        self.list_codes = np.memmap(ivf_dir / "codes.q", dtype=self.codes.dtype, mode='r', shape=self.codes.shape)
+        self.nprobe = nprobe
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    @classmethod
+    def train(cls, index_dir, nlist=None, iterations=10, sample_size=None, nprobe=16, seed=0):
+        """Partition an existing flat index; k-means runs on a sample of its rows
+
+        The result is published as a new version that hard-links the flat
+        files, so processes searching the current version are undisturbed.
+        """
+        flat = QuantizedVectorIndex(index_dir)
+        count = len(flat)
+        nlist = min(nlist or default_nlist(count), count)
+        sample_size = min(count, sample_size or max(nlist * 40, 10000))
+        rng = np.random.default_rng(seed)
+        sample = flat.vectors[np.sort(rng.choice(count, sample_size, replace=False))]
+        centroids = spherical_kmeans(sample, nlist, iterations, seed)
+
+        labels = _assign(flat.vectors, centroids)
+        order = np.argsort(labels, kind='stable')
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+
+        version_dir = new_version(index_dir)
+        try:
+            for path in flat.index_dir.iterdir():
+                if path.is_file():
+                    try:
+                        os.link(path, version_dir / path.name)
+                    except OSError:
+                        shutil.copy2(path, version_dir / path.name)
+            ivf_dir = version_dir / IVF_DIR
+            ivf_dir.mkdir()
+            centroids.astype(np.float32).tofile(ivf_dir / "centroids.f32")
+            offsets.tofile(ivf_dir / "list_offsets.i64")
+            order.astype(np.int64).tofile(ivf_dir / "list_rows.i64")
+            codes = np.memmap(ivf_dir / "codes.q", dtype=flat.codes.dtype, mode='w+', shape=flat.codes.shape)
+            for start in range(0, count, 65536):
+                codes[start:start + 65536] = flat.codes[order[start:start + 65536]]
+            codes.flush()
+            with open(ivf_dir / "manifest.json", 'w') as f:
+                json.dump({'nlist': nlist, 'count': count, 'iterations': iterations, 'sample_size': sample_size}, f)
+        except BaseException:
+            shutil.rmtree(version_dir, ignore_errors=True)
+            raise
+        publish_version(index_dir, version_dir)
+        return cls(index_dir, nprobe)
+
+    def probe_lists(self, query, nprobe=None):
+        """The nprobe lists whose centroids are most similar to the query"""
+        return _top_k(self.centroids @ _normalize(query), nprobe or self.nprobe)
+
+    def search_rows(self, query, k=5, rerank=10, nprobe=None):
+        scaled = _normalize(query)
+        if self.quantization == 'int8':
+            scaled = scaled * self.scales
+        rows, coarse = [], []
+        for p in self.probe_lists(query, nprobe):
+            start, end = self.list_offsets[p], self.list_offsets[p + 1]
+            rows.append(self.list_rows[start:end])
+            coarse.append(self.list_codes[start:end].astype(np.float32) @ scaled)
+        rows, coarse = np.concatenate(rows), np.concatenate(coarse)
+        candidates = np.sort(rows[_top_k(coarse, k * rerank)])  # sequential reads from the memory map
+        exact = np.asarray(self.vectors[candidates]) @ _normalize(query)
+        best = _top_k(exact, k)
+        return [(int(candidates[i]), float(exact[i])) for i in best]
+
+
+def open_vector_index(index_dir, backend='auto', nprobe=16):
+    """The index under index_dir with the requested search backend
+
+    'auto' uses the IVF partition when one has been trained for the current
+    rows and the flat scan otherwise.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown vector index backend: {backend}")
+    if backend == 'flat':
+        return QuantizedVectorIndex(index_dir)
+    if backend == 'ivf' or (Path(index_dir) / IVF_DIR / "manifest.json").exists():
+        try:
+            return IVFIndex(index_dir, nprobe)
+        except ValueError:
+            if backend == 'ivf':
+                raise
+    return QuantizedVectorIndex(index_dir)
+
+
+if __name__ == "__main__":
+    # Benchmark: recall@k and latency of IVF search across corpus sizes, nlist and nprobe
+    # usage: python ann_index.py [sizes...]   e.g. python ann_index.py 10000 100000 1000000
+    import sys
+    import tempfile
+    from vector_index import _synthetic_corpus, _synthetic_queries
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    dim, k, queries = 384, 10, 50
+
+    print("🧭 IVF SEARCH BENCHMARK")
+    print("=" * 50)
+    for n in sizes:
+        corpus = _synthetic_corpus(n, dim, clusters=max(64, n // 1000))
+        probes = _synthetic_queries(corpus, queries)
+        truth = [set(_top_k(corpus @ q, k).tolist()) for q in probes]
+
+        with tempfile.TemporaryDirectory() as scratch:
+            index_dir = Path(scratch) / "flat-index"
+            flat = QuantizedVectorIndex.build(index_dir, [str(i) for i in range(n)], corpus)
+            del corpus
+            start = time.perf_counter()
+            for q in probes:
+                flat.search_rows(q, k, 4)
+            flat_ms = (time.perf_counter() - start) * 1000 / queries
+
+            print(f"\n📦 {n:,} chunks; flat int8 scan {flat_ms:.2f} ms/query")
+
+            base = default_nlist(n)
+            for nlist in sorted({max(1, base // 2), base, base * 2}):
+                start = time.perf_counter()
+                ivf = IVFIndex.train(index_dir, nlist)
+                train_s = time.perf_counter() - start
+                print(f"🧭 nlist {ivf.nlist} ({ivf.nlist / base:.1f}x sqrt(n)), trained in {train_s:.1f}s")
+                for nprobe in (1, 4, 16, 64):
+                    if nprobe > ivf.nlist:
+                        break
+                    start = time.perf_counter()
+                    found = [ivf.search_rows(q, k, 4, nprobe) for q in probes]
+                    ms = (time.perf_counter() - start) * 1000 / queries
+                    recall = np.mean([len(truth[i] & {row for row, _ in hits}) / k for i, hits in enumerate(found)])
+                    print(f"⚡   nprobe {nprobe:3d}  {ms:7.2f} ms/query, "
+                          f"{ms and flat_ms / ms:5.1f}x vs flat, recall@{k} {recall:.3f}")
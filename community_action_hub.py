@@ -7,13 +7,17 @@ Transforms community knowledge into actionable community empowerment
 import streamlit as st
 import sys
 import os
-import json
 import time
-from pathlib import Path
 from datetime import datetime
 import uuid
 import base64
 
+from contribution_store import ContributionStore, SharedContributionCache, SUMMARY_FIELDS
+from contribution_index import ContributionRepository
+from contribution_model import Contribution, ContributionType
+from media_index import MediaIndex
+from engine_registry import registry
+
 # Add scripts to path
 sys.path.append('/home/yethatsjames/community-ai-workspace/scripts')
 
@@ -269,34 +273,56 @@ if 'media_processor' not in st.session_state:
 if 'multimodal_engine' not in st.session_state:
     st.session_state.multimodal_engine = None
 
-if 'contributions' not in st.session_state:
-    # Load existing contributions
-    contributions_file = Path("/home/yethatsjames/community-ai-workspace/community_contributions.json")
-    if contributions_file.exists():
-        with open(contributions_file, 'r') as f:
-            st.session_state.contributions = json.load(f)
-    else:
-        st.session_state.contributions = []
+@st.cache_resource
+def get_contribution_cache():
+    """One contribution cache per server process, shared by all sessions"""
+    repository = ContributionRepository()
+    return SharedContributionCache(
+        ContributionStore(repository=repository),
+        fields=SUMMARY_FIELDS,
+        # Compact records; story text and other payloads load from the index when opened
+        record_factory=lambda record: Contribution.from_dict(record, loader=repository.get)
+    )
+
+@st.cache_resource
+def get_media_index():
+    """Shared file_id -> media metadata index"""
+    return MediaIndex()
+
+contribution_cache = get_contribution_cache()
+media_index = get_media_index()
+contribution_repository = contribution_cache.store.repository
+
+# Load contributions once per process, then pick up writes from other sessions and processes
+contribution_cache.refresh()
+
+@st.cache_resource
+def start_engine_warm_up():
+    """Load the shared engines in the background as soon as the server starts serving"""
+    return registry.warm_up(['insights', 'media', 'multimodal'])
+
+start_engine_warm_up()
 
 def load_insights_engine():
     """Load the actionable insights engine"""
     if st.session_state.insights_engine is None:
-        with st.spinner("🔄 Loading Community Action Intelligence..."):
-            try:
-                from actionable_insights import ActionableInsightsEngine
-                st.session_state.insights_engine = ActionableInsightsEngine()
-                return True
-            except Exception as e:
-                st.error(f"❌ Error loading system: {e}")
-                return False
+        try:
+            if registry.is_loaded('insights'):
+                st.session_state.insights_engine = registry.get('insights')
+            else:
+                with st.spinner("🔄 Loading Community Action Intelligence..."):
+                    st.session_state.insights_engine = registry.get('insights')
+            return True
+        except Exception as e:
+            st.error(f"❌ Error loading system: {e}")
+            return False
     return True
 
 def load_media_processor():
     """Load the media processing engine"""
     if st.session_state.media_processor is None:
         try:
-            from media_processor import MediaProcessor
-            st.session_state.media_processor = MediaProcessor()
+            st.session_state.media_processor = registry.get('media')
             return True
         except Exception as e:
             st.error(f"❌ Error loading media processor: {e}")
@@ -307,24 +333,27 @@ def load_multimodal_engine():
     """Load the multi-modal analysis engine"""
     if st.session_state.multimodal_engine is None:
         try:
-            from multimodal_engine import MultiModalEngine
-            st.session_state.multimodal_engine = MultiModalEngine()
+            st.session_state.multimodal_engine = registry.get('multimodal')
             return True
         except Exception as e:
             st.error(f"❌ Error loading multimodal engine: {e}")
             return False
     return True
 
+@st.cache_data(ttl=60)
+def knowledge_base_size(_engine):
+    """Knowledge base document count, refreshed at most once a minute"""
+    return _engine.rag.collection.count()
+
 def save_contribution(contribution_data):
     """Save a new community contribution"""
     contribution_data['id'] = str(uuid.uuid4())
     contribution_data['timestamp'] = datetime.now().isoformat()
-    st.session_state.contributions.append(contribution_data)
+    contribution = Contribution.from_dict(contribution_data)
     
-    # Save to file
-    contributions_file = Path("/home/yethatsjames/community-ai-workspace/community_contributions.json")
-    with open(contributions_file, 'w') as f:
-        json.dump(st.session_state.contributions, f, indent=2)
+    # Append to the journal instead of rewriting the whole history
+    contribution_cache.append(contribution.to_dict())
+    return contribution
 
 # Main header with SDI logo
 st.markdown('''
@@ -575,6 +604,12 @@ if page == "🎯 Get Insights":
                 # Generate actionable insights
                 insights = engine.generate_actionable_insights(query, results['results'])
             
+            reranker = getattr(engine.rag, 'reranker', None)
+            if reranker is not None:
+                rerank_stats = reranker.stats.snapshot()
+                st.caption(f"🎯 Re-ranked {rerank_stats['reranked']} of {rerank_stats['queries']} searches "
+                           f"(p95 {rerank_stats['p95_ms']:.0f} ms, over time budget {rerank_stats['budget_hit_rate']:.0%})")
+            
             # Display insights with rich formatting
             st.markdown(f'<div class="insight-header"><h2>🎯 Action Plan: {insights["theme"]}</h2><p>Based on real community experiences</p></div>', unsafe_allow_html=True)
             
@@ -776,6 +811,7 @@ elif page == "📸 Share Media":
                             if result['success']:
                                 file_id = result['file_id']
                                 file_type = result['metadata']['file_type']
+                                media_index.record(file_id, result['metadata'])
                                 
                                 # Process based on file type
                                 if file_type == 'image':
@@ -784,6 +820,7 @@ elif page == "📸 Share Media":
                                         st.success("📸 Image processed successfully!")
                                         # Show thumbnail
                                         if 'thumbnail_path' in process_result:
+                                            media_index.set_thumbnail(file_id, process_result['thumbnail_path'])
                                             st.image(process_result['thumbnail_path'], 
                                                    caption="📸 Your contribution", width=200)
                                         
@@ -844,35 +881,64 @@ elif page == "📸 Share Media":
     # Show recent contributions including media
     st.subheader("🌟 Recent Community Contributions")
     
-    recent_contributions = sorted(st.session_state.contributions, key=lambda x: x['timestamp'], reverse=True)[:5]
+    if 'recent_pages' not in st.session_state:
+        st.session_state.recent_pages = 1
+    
+    # Walk the timestamp index one page at a time
+    recent_contributions = []
+    more_available = False
+    cursor = None
+    for _ in range(st.session_state.recent_pages):
+        page_items = [Contribution.from_dict(c) for c in contribution_repository.recent(5, before_cursor=cursor)]
+        recent_contributions.extend(page_items)
+        more_available = len(page_items) == 5
+        if not more_available:
+            break
+        cursor = contribution_repository.page_cursor(page_items[-1])
     
     if recent_contributions:
+        # Resolve every card's thumbnail in one lookup
+        media_files = media_index.get_many([c.file_id for c in recent_contributions])
+        
+        # Backfill uploads made before the media index existed, listing the upload folder
+        # only for file_ids this session hasn't already looked for
+        if 'media_backfill_checked' not in st.session_state:
+            st.session_state.media_backfill_checked = set()
+        missing = {c.file_id for c in recent_contributions
+                   if c.type == ContributionType.MEDIA_UPLOAD and c.file_id and c.file_id not in media_files}
+        missing -= st.session_state.media_backfill_checked
+        if missing and load_media_processor():
+            st.session_state.media_backfill_checked |= missing
+            media_index.rebuild(f for f in st.session_state.media_processor.list_uploaded_files()
+                                if f.get('file_id') in missing)
+            media_files.update(media_index.get_many(missing))
+        
         for contrib in recent_contributions:
             with st.container():
-                title = contrib.get('title', contrib['type'].replace('_', ' ').title())
+                title = contrib.title or contrib.type.replace('_', ' ').title()
                 
-                if contrib['type'] == 'media_upload':
-                    st.markdown(f"**📸 {contrib.get('data_type', 'Media')}**")
+                if contrib.type == ContributionType.MEDIA_UPLOAD:
+                    st.markdown(f"**📸 {contrib.data_type or 'Media'}**")
                     st.write(f"📝 {contrib.get('description', 'No description')}")
                     
                     # Show thumbnail if available
-                    if load_media_processor():
-                        processor = st.session_state.media_processor
-                        uploaded_files = processor.list_uploaded_files()
-                        
-                        matching_file = next((f for f in uploaded_files if f.get('file_id') == contrib.get('file_id')), None)
-                        if matching_file and 'thumbnail_file' in matching_file:
-                            try:
-                                st.image(matching_file['thumbnail_file'], width=150, caption="📸 Community contribution")
-                            except:
-                                pass
+                    matching_file = media_files.get(contrib.file_id)
+                    if matching_file and 'thumbnail_file' in matching_file:
+                        try:
+                            st.image(matching_file['thumbnail_file'], width=150, caption="📸 Community contribution")
+                        except:
+                            pass
                 else:
                     st.markdown(f"**{title}**")
                 
-                if 'community' in contrib:
-                    st.write(f"🏘️ {contrib['community']}")
-                st.write(f"⏰ {contrib['timestamp'][:10]}")
+                if contrib.community:
+                    st.write(f"🏘️ {contrib.community}")
+                st.write(f"⏰ {contrib.timestamp[:10]}")
                 st.markdown("---")
+        
+        if more_available and st.button("⬇️ Load More Contributions", key="load_more_contributions"):
+            st.session_state.recent_pages += 1
+            st.rerun()
     else:
         st.info("🌱 Be the first to contribute to your Community Data Commons!")
 
@@ -885,23 +951,24 @@ elif page == "📊 Track Impact":
         st.stop()
     
     engine = st.session_state.insights_engine
-    doc_count = engine.rag.collection.count()
+    doc_count = knowledge_base_size(engine)
     
-    # Impact metrics
+    # Impact metrics (running counters, updated on every contribution)
+    rollup = contribution_cache.rollup
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         st.metric("🧠 Community Insights", doc_count)
     
     with col2:
-        st.metric("🤝 Contributions", len(st.session_state.contributions))
+        st.metric("🤝 Contributions", rollup.total)
     
     with col3:
-        action_starts = len([c for c in st.session_state.contributions if c.get('type') == 'action_started'])
+        action_starts = rollup.count_by_type(ContributionType.ACTION_STARTED)
         st.metric("🚀 Actions Started", action_starts)
     
     with col4:
-        communities = len(set([c.get('community', 'Unknown') for c in st.session_state.contributions]))
+        communities = rollup.community_count()
         st.metric("🌍 Communities", communities)
     
     # Impact visualization
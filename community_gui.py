@@ -11,6 +11,8 @@ import json
 import time
 from pathlib import Path
 
+from engine_registry import registry
+
 # Add scripts to path
 sys.path.append('/home/yethatsjames/community-ai-workspace/scripts')
 
@@ -74,19 +76,45 @@ page = st.sidebar.radio(
 if 'rag_system' not in st.session_state:
     st.session_state.rag_system = None
 
+@st.cache_resource
+def start_engine_warm_up():
+    """Load the shared knowledge base in the background as soon as the server starts serving"""
+    return registry.warm_up(['rag'])
+
+start_engine_warm_up()
+
 def load_rag_system():
     """Load the RAG system"""
     if st.session_state.rag_system is None:
-        with st.spinner("🔄 Loading Community Knowledge Base..."):
-            try:
-                from privacy_rag import CommunityRAG
-                st.session_state.rag_system = CommunityRAG()
-                return True
-            except Exception as e:
-                st.error(f"❌ Error loading system: {e}")
-                return False
+        try:
+            if registry.is_loaded('rag'):
+                st.session_state.rag_system = registry.get('rag')
+            else:
+                with st.spinner("🔄 Loading Community Knowledge Base..."):
+                    st.session_state.rag_system = registry.get('rag')
+            return True
+        except Exception as e:
+            st.error(f"❌ Error loading system: {e}")
+            return False
     return True
 
+def knowledge_analytics(rag):
+    """Corpus statistics from the analytics job runner, plus one sample chunk
+
+    Shows the last computed statistics straight away; if the collection has
+    changed since, they are recomputed in the background for the next visit.
+    Only the very first computation is waited for.
+    """
+    runner = registry.get('analytics')
+    stats, fresh = runner.latest(rag)
+    if stats is None:
+        with st.spinner("📈 Counting themes and communities across the knowledge base..."):
+            runner.wait()
+        stats, fresh = runner.latest(rag)
+    first = next(rag.iter_documents(batch_size=1), None)
+    sample = (first['documents'][0], first['metadatas'][0]) if first else None
+    return stats, fresh, sample
+
 def check_system_status():
     """Check system components"""
     workspace_path = Path("/home/yethatsjames/community-ai-workspace")
@@ -229,10 +257,20 @@ elif page == "🔍 Search Community Knowledge":
         placeholder="e.g., How do youth organize protests?"
     )
     
+    search_modes = {
+        "🧠 Meaning (AI similarity)": "auto",
+        "🔀 Meaning + Keywords": "hybrid",
+        "🔤 Exact Words Only (fastest)": "lexical"
+    }
+    search_mode = st.radio("Search style:", list(search_modes.keys()), horizontal=True)
+    
     if st.button("🔍 Search Community Knowledge", disabled=not query.strip()):
         if query.strip():
             with st.spinner(f"🧠 Searching for: '{query}'"):
-                results = rag.query_knowledge_base(query, n_results=5)
+                results = rag.query_knowledge_base(query, n_results=5, mode=search_modes[search_mode])
+            
+            cache_stats = rag.cache.stats()
+            st.caption(f"⚡ Query cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
             
             st.subheader("📋 Search Results")
             
@@ -258,22 +296,17 @@ elif page == "📊 View Community Insights":
         st.stop()
     
     rag = st.session_state.rag_system
-    
-    # Get all data for analysis
-    all_data = rag.collection.get(include=['documents', 'metadatas'])
-    documents = all_data['documents']
-    metadatas = all_data['metadatas']
-    
-    # Community breakdown
-    communities = {}
-    for metadata in metadatas:
-        community = metadata['community']
-        if community in communities:
-            communities[community] += 1
-        else:
-            communities[community] = 1
+    stats, fresh, sample = knowledge_analytics(rag)
+    if stats is None:
+        st.error(f"❌ Could not compute analytics: {registry.get('analytics').error}")
+        st.stop()
+    communities, theme_counts = stats['communities'], stats['themes']
+    if not fresh:
+        st.caption(f"🔄 Showing statistics for {stats['documents']:,} insights; "
+                   "refreshing for newly added transcripts in the background")
     
     st.subheader("🏘️ Communities Represented")
+    st.write(f"**{stats['participants']}** participants across **{len(communities)}** communities")
     
     for community, count in communities.items():
         st.write(f"**{community}**: {count} insights")
@@ -281,22 +314,6 @@ elif page == "📊 View Community Insights":
     # Theme analysis
     st.subheader("🎯 Key Themes Detected")
     
-    themes = {
-        'Youth Empowerment': ['youth', 'young people', 'skills', 'training'],
-        'Government Engagement': ['government', 'offices', 'baraza', 'leaders'],
-        'Community Organizing': ['community', 'organizing', 'members', 'programs'],
-        'Media & Storytelling': ['media', 'stories', 'narrative', 'voices'],
-        'Economic Development': ['finance', 'loans', 'unemployment', 'opportunities']
-    }
-    
-    theme_counts = {}
-    for theme_name, keywords in themes.items():
-        count = 0
-        for doc in documents:
-            doc_lower = doc.lower()
-            count += sum(1 for keyword in keywords if keyword in doc_lower)
-        theme_counts[theme_name] = count
-    
     # Display theme results
     for theme, count in sorted(theme_counts.items(), key=lambda x: x[1], reverse=True):
         st.metric(label=theme, value=f"{count} mentions")
@@ -304,9 +321,8 @@ elif page == "📊 View Community Insights":
     # Sample content
     st.subheader("📝 Sample Community Voices")
     
-    if documents:
-        sample_doc = documents[0]
-        sample_meta = metadatas[0]
+    if sample:
+        sample_doc, sample_meta = sample
         
         st.write(f"**From {sample_meta['community']} - {sample_meta['participant_id']}:**")
         st.write(f'"{sample_doc[:300]}..."')
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+🔎 COMMUNITY DATA COMMONS - CONTRIBUTION INDEX
+SQLite-backed repository for fast contribution lookups
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+WORKSPACE_PATH = Path("/home/yethatsjames/community-ai-workspace")
+INDEX_FILE = WORKSPACE_PATH / "contributions" / "contributions.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contributions (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    community TEXT NOT NULL,
+    timestamp TEXT,
+    file_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_contributions_type ON contributions(type);
+CREATE INDEX IF NOT EXISTS idx_contributions_community ON contributions(community);
+-- (timestamp, id) replaces the timestamp-only index older databases were created with
+DROP INDEX IF EXISTS idx_contributions_timestamp;
+CREATE INDEX IF NOT EXISTS idx_contributions_timestamp_id ON contributions(timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_contributions_file_id ON contributions(file_id);
+"""
+
+
+class ContributionRepository:
+    """Indexed, queryable view of community contributions
+
+    The journal in contribution_store stays the source of truth; this repository
+    mirrors it in SQLite (WAL mode) so dashboards can count and page through
+    contributions with index lookups instead of scanning every record.
+    """
+
+    def __init__(self, db_path=INDEX_FILE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _connection(self):
+        """One connection per thread - Streamlit serves each session on its own thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _row(self, contribution):
+        return (
+            contribution['id'],
+            contribution.get('type'),
+            # Matches the dashboard's notion of a community for records without one
+            contribution.get('community', 'Unknown'),
+            contribution.get('timestamp'),
+            contribution.get('file_id'),
+            json.dumps(contribution)
+        )
+
+    def add(self, contribution):
+        """Index a single contribution"""
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO contributions VALUES (?, ?, ?, ?, ?, ?)", self._row(contribution))
+
+    def add_many(self, contributions):
+        """Index many contributions in one transaction"""
+        conn = self._connection()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO contributions VALUES (?, ?, ?, ?, ?, ?)",
+                             (self._row(c) for c in contributions))
+
+    def rebuild(self, contributions):
+        """Replace the index with the given (possibly streamed) contributions"""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM contributions")
+            conn.executemany("INSERT OR REPLACE INTO contributions VALUES (?, ?, ?, ?, ?, ?)",
+                             (self._row(c) for c in contributions))
+
+    def get(self, contribution_id):
+        """The full record, including large payloads left out of the summary cache"""
+        row = self._connection().execute(
+            "SELECT data FROM contributions WHERE id = ?", (contribution_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM contributions").fetchone()[0]
+
+    def count_by_type(self, contribution_type):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM contributions WHERE type = ?", (contribution_type,)
+        ).fetchone()[0]
+
+    def distinct_communities(self):
+        rows = self._connection().execute("SELECT DISTINCT community FROM contributions ORDER BY community")
+        return [row[0] for row in rows]
+
+    def recent(self, limit=5, before_cursor=None):
+        """Up to limit contributions, newest first, starting after before_cursor
+
+        The cursor for the next page is page_cursor() of the last record returned,
+        so each page is a bounded walk of the timestamp index however long the
+        history grows.
+        """
+        if before_cursor is None:
+            rows = self._connection().execute(
+                "SELECT data FROM contributions ORDER BY timestamp DESC, id DESC LIMIT ?", (limit,)
+            )
+        else:
+            rows = self._connection().execute(
+                "SELECT data FROM contributions WHERE (timestamp, id) < (?, ?) "
+                "ORDER BY timestamp DESC, id DESC LIMIT ?", (*before_cursor, limit)
+            )
+        return [json.loads(row[0]) for row in rows]
+
+    @staticmethod
+    def page_cursor(contribution):
+        """Cursor that continues a recent() listing after this contribution"""
+        return (contribution['timestamp'], contribution['id'])
+
+    def by_file_id(self, file_id):
+        row = self._connection().execute(
+            "SELECT data FROM contributions WHERE file_id = ?", (file_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
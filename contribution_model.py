@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+🧩 COMMUNITY DATA COMMONS - CONTRIBUTION MODEL
+Compact, slotted records for community contributions
+"""
+
+import sys
+from enum import Enum
+
+
+class _Label(str, Enum):
+    """Enum that prints and formats as its plain string value"""
+
+    def __str__(self):
+        return self.value
+
+    def __format__(self, spec):
+        return format(self.value, spec)
+
+
+class ContributionType(_Label):
+    GOVERNANCE_FOUNDATION = 'governance_foundation'
+    COMMUNITY_STORY = 'community_story'
+    MEDIA_UPLOAD = 'media_upload'
+    ACTION_STARTED = 'action_started'
+    CONNECTION_REQUEST = 'connection_request'
+
+
+class FileType(_Label):
+    IMAGE = 'image'
+    VIDEO = 'video'
+    AUDIO = 'audio'
+    DOCUMENT = 'document'
+
+
+def _intern(enum_class, value):
+    """Shared enum member for known values, an interned string for anything else"""
+    if value is None:
+        return None
+    try:
+        return enum_class(value)
+    except ValueError:
+        return sys.intern(value)
+
+
+def _intern_str(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Contribution:
+    """One community contribution
+
+    The fields every page needs live in slots; type and file_type are shared enum
+    members and community / data_type labels are interned, so a million records
+    don't carry a million copies of 'media_upload'. Everything else (story text,
+    descriptions, governance content) is the payload, which is either attached up
+    front or fetched by id through the loader the first time it is touched.
+    """
+
+    __slots__ = ('id', 'type', 'community', 'timestamp', 'title', 'file_id', 'file_type', 'data_type',
+                 '_payload', '_loader')
+
+    FIELDS = ('id', 'type', 'community', 'timestamp', 'title', 'file_id', 'file_type', 'data_type')
+
+    def __init__(self, id, type, timestamp=None, community=None, title=None, file_id=None,
+                 file_type=None, data_type=None, payload=None, loader=None):
+        self.id = id
+        self.type = _intern(ContributionType, type)
+        self.timestamp = timestamp
+        self.community = _intern_str(community)
+        self.title = title
+        self.file_id = file_id
+        self.file_type = _intern(FileType, file_type)
+        self.data_type = _intern_str(data_type)
+        self._payload = payload
+        self._loader = loader
+
+    @classmethod
+    def from_dict(cls, record, loader=None):
+        """Build from a stored record; keys outside FIELDS become the payload"""
+        payload = {key: value for key, value in record.items() if key not in cls.FIELDS}
+        return cls(
+            record['id'], record.get('type'), record.get('timestamp'), record.get('community'),
+            record.get('title'), record.get('file_id'), record.get('file_type'), record.get('data_type'),
+            # Empty means "not read yet" when there is a loader, and costs nothing otherwise
+            payload=payload or None,
+            loader=loader
+        )
+
+    @property
+    def payload(self):
+        """Large fields, loaded on first access when the record came from a summary"""
+        if self._payload is None:
+            if self._loader is None:
+                return {}
+            full = self._loader(self.id) or {}
+            self._payload = {key: value for key, value in full.items() if key not in self.FIELDS}
+        return self._payload
+
+    def to_dict(self):
+        record = {field: getattr(self, field) for field in self.FIELDS if getattr(self, field) is not None}
+        record.update(self.payload)
+        return record
+
+    # Mapping-style access so code written against plain dicts keeps working
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            return default if value is None else value
+        return self.payload.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __repr__(self):
+        return f"Contribution(id={self.id!r}, type={self.get('type')!r})"
+
+
+def _synthetic_record(i):
+    # ''.join() gives each record its own string objects, as json.load does
+    communities = ['Kibera Community Group', 'Mungano Training Network', 'Kenya Youth Movement', 'SDI Secretariat']
+    data_types = ['📸 Community Photos (Events, Meetings, Activities)', '🔊 Audio Recordings (Meetings, Interviews)']
+    return {
+        'id': f"{i:08x}-4cdb-931b-3664a7f72fe1",
+        'type': 'media_upload' if i % 2 else 'community_story',
+        'community': ''.join(communities[i % len(communities)]),
+        'timestamp': f"2025-08-{i % 28 + 1:02d}T20:12:05.{i % 1000000:06d}",
+        'data_type': ''.join(data_types[i % len(data_types)]),
+        'file_type': ''.join('image'),
+    }
+
+
+if __name__ == "__main__":
+    # Memory benchmark: per-record footprint of plain dicts vs slotted records
+    import gc
+    import tracemalloc
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    def measure(build):
+        gc.collect()
+        tracemalloc.start()
+        records = build()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del records
+        return size / n
+
+    as_dicts = measure(lambda: [_synthetic_record(i) for i in range(n)])
+    as_records = measure(lambda: [Contribution.from_dict(_synthetic_record(i)) for i in range(n)])
+
+    print("🧩 CONTRIBUTION MEMORY BENCHMARK")
+    print("=" * 50)
+    print(f"📦 {n:,} synthetic contributions")
+    print(f"📖 dict records:    {as_dicts:7.1f} bytes/record")
+    print(f"🧩 slotted records: {as_records:7.1f} bytes/record")
+    print(f"✅ {as_dicts / as_records:.1f}x smaller")
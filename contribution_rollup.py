@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+📊 COMMUNITY DATA COMMONS - CONTRIBUTION ROLLUP
+Running impact counters for the Track Impact dashboard
+"""
+
+from collections import Counter
+
+
+class ContributionRollup:
+    """Contribution totals by type, community and day, updated one record at a time
+
+    Reads are O(1) dictionary lookups. rebuild() recomputes everything from the
+    full history so the running totals can be checked for drift.
+    """
+
+    def __init__(self, contributions=()):
+        self.total = 0
+        self.by_type = Counter()
+        self.by_community = Counter()
+        self.by_day = Counter()
+        self.add_many(contributions)
+
+    def add(self, contribution):
+        """Count one new contribution"""
+        self.total += 1
+        self.by_type[contribution.get('type')] += 1
+        self.by_community[contribution.get('community', 'Unknown')] += 1
+        self.by_day[contribution.get('timestamp', '')[:10]] += 1
+
+    def add_many(self, contributions):
+        for contribution in contributions:
+            self.add(contribution)
+
+    def count_by_type(self, contribution_type):
+        return self.by_type[contribution_type]
+
+    def community_count(self):
+        return len(self.by_community)
+
+    @classmethod
+    def rebuild(cls, contributions):
+        """Recompute every counter from scratch"""
+        return cls(contributions)
+
+    def matches(self, other):
+        """True if both rollups hold identical counters"""
+        return (self.total == other.total and self.by_type == other.by_type
+                and self.by_community == other.by_community and self.by_day == other.by_day)
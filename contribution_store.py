@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+🗄️ COMMUNITY DATA COMMONS - CONTRIBUTION STORE
+Append-only journal for community contributions
+"""
+
+import os
+import re
+import json
+import time
+import fcntl
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+from contribution_rollup import ContributionRollup
+
+WORKSPACE_PATH = Path("/home/yethatsjames/community-ai-workspace")
+CONTRIBUTIONS_FILE = WORKSPACE_PATH / "community_contributions.json"
+STORE_DIR = WORKSPACE_PATH / "contributions"
+
+SNAPSHOT_NAME = "snapshot.jsonl"
+# Single-document snapshot written before the line-delimited format; read until the next compaction replaces it
+OLD_SNAPSHOT_NAME = "snapshot.json"
+LOCK_NAME = ".lock"
+SEGMENT_PATTERN = "journal-*.jsonl"
+
+# Fields the dashboards need; large payloads such as story text or the
+# SDI Secretariat governance content are fetched from the repository on demand
+SUMMARY_FIELDS = ('id', 'type', 'community', 'timestamp', 'title', 'file_id', 'file_type', 'data_type')
+
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def _project(record, fields):
+    if fields is None:
+        return record
+    return {field: record[field] for field in fields if field in record}
+
+
+def iter_json_array(path, chunk_size=1 << 16):
+    """Yield the elements of a top-level JSON array one at a time
+
+    Reads the file in chunks, so memory holds one element plus a chunk instead
+    of the whole document and its parsed copy.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = f.read(chunk_size)
+        pos = _SEPARATORS.match(buffer, 0).end()
+        if buffer[pos:pos + 1] != '[':
+            raise ValueError(f"{path} is not a JSON array")
+        pos += 1
+        eof = False
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if buffer[pos:pos + 1] == ']':
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Element straddles the chunk boundary - read more and retry
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield element
+            pos = end
+
+
+class ContributionStore:
+    """Journaled contribution storage: a compacted snapshot plus append-only JSONL segments
+
+    Every contribution is written as a single fsync'd line in the current journal
+    segment, so a save costs one small append no matter how long the history is.
+    Once enough records pile up in the journal they are folded into the snapshot.
+    The original community_contributions.json is imported as the first snapshot.
+    An optional ContributionRepository is kept in step with every load and append.
+
+    Writers in every process serialize on an flock()ed lock file, and threads in
+    one process group-commit: whichever thread gets the lock writes everything
+    queued so far with a single fsync, so concurrent sessions share the cost.
+    If that write fails, every thread whose record was in the batch gets the
+    error - none of them is reported as saved.
+
+    The snapshot is line-delimited too (a header line, then one record per line),
+    so every read path streams records instead of parsing one large document.
+    A store compacted into the older single-document snapshot.json is still
+    read from it, and its next compaction rewrites it in the new format.
+    """
+
+    def __init__(self, store_dir=STORE_DIR, legacy_file=CONTRIBUTIONS_FILE, compact_threshold=1000, repository=None):
+        self.store_dir = Path(store_dir)
+        self.legacy_file = Path(legacy_file) if legacy_file else None
+        self.compact_threshold = compact_threshold
+        self.repository = repository
+        self.snapshot_file = self.store_dir / SNAPSHOT_NAME
+        self.old_snapshot_file = self.store_dir / OLD_SNAPSHOT_NAME
+        self.lock_file = self.store_dir / LOCK_NAME
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self._journal_count = None
+
+        # Group commit state: records queued by threads, the ticket last made durable,
+        # and the error for each ticket whose batch failed to write
+        self._queue = []
+        self._queue_lock = threading.Lock()
+        self._writer_lock = threading.Lock()
+        self._enqueued = 0
+        self._committed = 0
+        self._failed = {}
+
+    @contextmanager
+    def _file_lock(self, exclusive=True):
+        """Cross-process lock: exclusive for writers, shared for readers"""
+        with open(self.lock_file, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _segment_path(self, number):
+        return self.store_dir / f"journal-{number:06d}.jsonl"
+
+    def _segments(self):
+        """Journal segments on disk, oldest first, as (number, path) pairs"""
+        segments = []
+        for path in self.store_dir.glob(SEGMENT_PATTERN):
+            try:
+                segments.append((int(path.stem.split('-')[1]), path))
+            except (IndexError, ValueError):
+                continue
+        return sorted(segments)
+
+    def _read_old_snapshot(self):
+        with open(self.old_snapshot_file, 'r') as f:
+            return json.load(f)
+
+    def _last_compacted_segment(self):
+        """Journal segment number the snapshot covers, read from its header line"""
+        if self.snapshot_file.exists():
+            with open(self.snapshot_file, 'r') as f:
+                return json.loads(f.readline())['last_segment']
+        if self.old_snapshot_file.exists():
+            return self._read_old_snapshot()['last_segment']
+        return 0
+
+    def _iter_snapshot(self):
+        if self.snapshot_file.exists():
+            with open(self.snapshot_file, 'r') as f:
+                f.readline()
+                for line in f:
+                    yield json.loads(line)
+        elif self.old_snapshot_file.exists():
+            yield from self._read_old_snapshot()['contributions']
+        elif self.legacy_file and self.legacy_file.exists():
+            yield from iter_json_array(self.legacy_file)
+
+    def _iter_segment(self, path):
+        """Stream one journal segment, skipping torn lines from interrupted appends"""
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def _iter_journal(self, after_segment):
+        for number, path in self._segments():
+            if number > after_segment:
+                yield from self._iter_segment(path)
+
+    def iter_contributions(self, fields=None):
+        """Lazily yield every contribution, optionally only the given fields
+
+        Holds the shared lock while iterating so a compaction cannot pull
+        segments out from under the reader - consume promptly.
+        """
+        with self._file_lock(exclusive=False):
+            last_segment = self._last_compacted_segment()
+            for record in self._iter_snapshot():
+                yield _project(record, fields)
+            for record in self._iter_journal(last_segment):
+                yield _project(record, fields)
+
+    def load(self, fields=None):
+        """Load every contribution: the snapshot followed by the journal"""
+        contributions, _ = self.load_with_cursor(fields)
+        return contributions
+
+    def load_with_cursor(self, fields=None):
+        """Load every contribution plus a journal cursor to tail new writes from"""
+        with self._file_lock(exclusive=False):
+            last_segment = self._last_compacted_segment()
+            contributions = [_project(record, fields) for record in self._iter_snapshot()]
+            journal = [_project(record, fields) for record in self._iter_journal(last_segment)]
+            cursor = self._end_cursor(last_segment)
+        self._journal_count = len(journal)
+        contributions.extend(journal)
+        if self.repository is not None:
+            if self.repository.count() != len({c['id'] for c in contributions}):
+                self.repository.rebuild(self.iter_contributions())
+        return contributions, cursor
+
+    def _end_cursor(self, last_segment):
+        segments = self._segments()
+        if not segments:
+            return (last_segment + 1, 0)
+        number, path = segments[-1]
+        return (number, path.stat().st_size)
+
+    def read_since(self, cursor, fields=None):
+        """Records appended after cursor and the advanced cursor
+
+        Returns (None, None) when a compaction has folded the cursor's segment
+        into the snapshot, in which case the caller should load() again.
+        """
+        number, offset = cursor
+        with self._file_lock(exclusive=False):
+            segments = [(n, path) for n, path in self._segments() if n >= number]
+            if segments and segments[0][0] != number:
+                return None, None
+
+            records = []
+            for n, path in segments:
+                start = offset if n == number else 0
+                with open(path, 'rb') as f:
+                    f.seek(start)
+                    data = f.read()
+                # Only consume complete lines
+                complete = data[:data.rfind(b'\n') + 1]
+                for line in complete.splitlines():
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(_project(json.loads(line), fields))
+                    except json.JSONDecodeError:
+                        continue
+                cursor = (n, start + len(complete))
+        return records, cursor
+
+    def _current_segment(self):
+        segments = self._segments()
+        if segments:
+            return segments[-1][0]
+        return self._last_compacted_segment() + 1
+
+    def append(self, contribution):
+        """Durably append a single contribution to the journal
+
+        Returns once the record is fsync'd, either by this thread or by another
+        thread that picked it up in the same group commit. Raises the write's
+        error if the batch holding the record could not be written.
+        """
+        line = (json.dumps(contribution) + '\n').encode('utf-8')
+        with self._queue_lock:
+            self._enqueued += 1
+            ticket = self._enqueued
+            self._queue.append((ticket, line, contribution))
+
+        with self._writer_lock:
+            # A later batch may have succeeded since, so check for our failure first
+            error = self._failed.pop(ticket, None)
+            if error is not None:
+                raise error
+            if self._committed >= ticket:
+                return contribution
+            with self._queue_lock:
+                batch, self._queue = self._queue, []
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                self._journal_count = None  # the append may have been partial - recount
+                for waiting, _, _ in batch:
+                    if waiting != ticket:
+                        self._failed[waiting] = e
+                raise
+            self._committed = batch[-1][0]
+        return contribution
+
+    def _write_batch(self, batch):
+        with self._file_lock():
+            pending = self._count_journal()
+            with open(self._segment_path(self._current_segment()), 'a+b') as f:
+                # Terminate a torn line left by an interrupted append so these records stay readable
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+                f.write(b''.join(line for _, line, _ in batch))
+                f.flush()
+                os.fsync(f.fileno())
+
+            if self.repository is not None:
+                self.repository.add_many(contribution for _, _, contribution in batch)
+
+            self._journal_count = pending + len(batch)
+            if self._journal_count >= self.compact_threshold:
+                self._compact()
+
+    def _count_journal(self):
+        if self._journal_count is None:
+            last_segment = self._last_compacted_segment()
+            self._journal_count = sum(1 for _ in self._iter_journal(last_segment))
+        return self._journal_count
+
+    def journal_size(self):
+        """Number of records waiting in the journal since the last snapshot"""
+        with self._file_lock(exclusive=False):
+            return self._count_journal()
+
+    def compact(self):
+        """Fold the journal into a new snapshot and drop the compacted segments"""
+        with self._file_lock():
+            return self._compact()
+
+    def _compact(self):
+        last_segment = self._last_compacted_segment()
+        segments = [(n, p) for n, p in self._segments() if n > last_segment]
+        # Another process may have compacted already - our count was only an estimate
+        if not any(True for _ in self._iter_journal(last_segment)):
+            self._journal_count = 0
+            return 0
+        compacted_through = segments[-1][0]
+
+        # Start a fresh segment so new appends never land in a file being compacted
+        self._segment_path(compacted_through + 1).touch()
+
+        # Stream the old snapshot and the journal into the new snapshot record by record
+        written = 0
+        tmp_file = self.snapshot_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            f.write(json.dumps({'last_segment': compacted_through}) + '\n')
+            for record in self._iter_snapshot():
+                f.write(json.dumps(record) + '\n')
+                written += 1
+            for number, path in segments:
+                for record in self._iter_segment(path):
+                    f.write(json.dumps(record) + '\n')
+                    written += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.snapshot_file)
+        if self.old_snapshot_file.exists():
+            self.old_snapshot_file.unlink()
+
+        for number, path in segments:
+            path.unlink()
+        self._journal_count = 0
+        return written
+
+
+class SharedContributionCache:
+    """Process-wide, read-mostly view of the contributions shared by every session
+
+    The history is parsed once per server process instead of once per browser
+    session. Each write bumps a generation counter, so a session can tell that
+    new contributions arrived by comparing the generation it last rendered.
+    New records - including ones written by other processes - are picked up by
+    tailing the journal rather than reloading everything.
+    A ContributionRollup is kept alongside so dashboard counters never rescan.
+    Pass fields (e.g. SUMMARY_FIELDS) to keep only what the pages need in memory,
+    and record_factory (e.g. Contribution.from_dict) to hold compact records.
+    The list returned by contributions() is shared - treat it as read-only.
+    """
+
+    def __init__(self, store, fields=None, record_factory=None):
+        self.store = store
+        self.fields = fields
+        self.record_factory = record_factory
+        self.generation = 0
+        self._contributions = None
+        self._cursor = None
+        self._lock = threading.Lock()
+        self.rollup = ContributionRollup()
+
+    def contributions(self):
+        """All contributions, loading them on first use"""
+        if self._contributions is None:
+            with self._lock:
+                if self._contributions is None:
+                    self._reload()
+        return self._contributions
+
+    def _records(self, records):
+        if self.record_factory is None:
+            return records
+        return [self.record_factory(record) for record in records]
+
+    def _reload(self):
+        contributions, self._cursor = self.store.load_with_cursor(self.fields)
+        self._contributions = self._records(contributions)
+        self.rollup = ContributionRollup.rebuild(self._contributions)
+        self.generation += 1
+
+    def _catch_up(self):
+        records, cursor = self.store.read_since(self._cursor, self.fields)
+        if records is None:
+            # The journal was compacted past our cursor - start again from the snapshot
+            self._reload()
+        elif records:
+            records = self._records(records)
+            self._contributions.extend(records)
+            self.rollup.add_many(records)
+            self._cursor = cursor
+            self.generation += 1
+
+    def append(self, contribution):
+        """Write through to the store and publish the record to every session"""
+        self.contributions()
+        self.store.append(contribution)
+        with self._lock:
+            self._catch_up()
+        return contribution
+
+    def refresh(self):
+        """Pick up contributions written since the last look, e.g. by another process"""
+        self.contributions()
+        with self._lock:
+            self._catch_up()
+        return self._contributions
+
+    def verify_rollup(self):
+        """Consistency check: do the running counters match a rebuild from scratch?"""
+        contributions = self.contributions()
+        with self._lock:
+            return self.rollup.matches(ContributionRollup.rebuild(contributions))
+
+
+def _stress_worker(store_dir, worker, threads, records):
+    """Append records from several threads of one process"""
+    store = ContributionStore(store_dir, legacy_file=None, compact_threshold=200)
+
+    def write(thread):
+        for i in range(records):
+            store.append({'id': f"{worker}-{thread}-{i}", 'type': 'stress_test'})
+
+    pool = [threading.Thread(target=write, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+
+def _failure_check(store_dir, threads=8):
+    """Fail one group commit mid-stream: every append must either be stored or raise"""
+    store = ContributionStore(store_dir, legacy_file=None)
+    write_batch = store._write_batch
+    failures = iter([OSError('disk full')])
+
+    def flaky_write(batch):
+        error = next(failures, None)
+        if error is not None:
+            raise error
+        write_batch(batch)
+
+    store._write_batch = flaky_write
+    outcomes = {}
+
+    def write(thread):
+        try:
+            store.append({'id': f"flaky-{thread}", 'type': 'stress_test'})
+            outcomes[thread] = 'ok'
+        except OSError:
+            outcomes[thread] = 'error'
+
+    # First wave queues up behind a held writer lock so it goes out as one (failing) batch
+    for wave in (range(threads // 2), range(threads // 2, threads)):
+        pool = [threading.Thread(target=write, args=(t,)) for t in wave]
+        with store._writer_lock:
+            for t in pool:
+                t.start()
+            while store._enqueued < wave[-1] + 1:
+                time.sleep(0.001)
+        for t in pool:
+            t.join()
+    stored = {c['id'] for c in ContributionStore(store_dir, legacy_file=None).load()}
+    reported = {f"flaky-{t}" for t, outcome in outcomes.items() if outcome == 'ok'}
+    return reported, stored, list(outcomes.values()).count('error')
+
+
+if __name__ == "__main__":
+    # Stress test: hammer one store from many processes and threads, then check nothing was lost
+    import tempfile
+    import multiprocessing
+
+    processes, threads, records = 4, 8, 100
+    expected = processes * threads * records
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        start = time.time()
+        workers = [multiprocessing.Process(target=_stress_worker, args=(store_dir, w, threads, records))
+                   for w in range(processes)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.time() - start
+
+        contributions = ContributionStore(store_dir, legacy_file=None).load()
+        ids = [c['id'] for c in contributions]
+
+        print("🧪 CONTRIBUTION STORE STRESS TEST")
+        print("=" * 50)
+        print(f"✍️  {processes} processes x {threads} threads x {records} records")
+        print(f"⏱️  {expected / elapsed:.0f} durable appends/sec")
+        print(f"📦 {len(ids)} records stored, {len(set(ids))} unique (expected {expected})")
+        assert len(ids) == len(set(ids)) == expected, "records were lost or duplicated"
+        print("✅ No records lost")
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        reported, stored, errors = _failure_check(store_dir)
+        print(f"💥 failed group commit: {errors} appends raised, {len(reported)} reported saved, "
+              f"{len(stored)} stored")
+        assert errors == 4 and reported == stored, "an append was reported saved but not stored"
+        print("✅ Failed writes are reported to every caller in the batch")
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+🏎️ COMMUNITY DATA COMMONS - EMBEDDING BACKENDS
+CPU-friendly ways to run the knowledge base's embedding model
+"""
+
+import os
+import json
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+WORKSPACE_PATH = Path("/home/yethatsjames/community-ai-workspace")
+ONNX_MODEL_DIR = WORKSPACE_PATH / "models" / "onnx"
+
+DEFAULT_EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+# 'auto' picks the fastest backend that reproduces the collection's vectors:
+# an ONNX export of the same model if present, else the stock
+# SentenceTransformer. The int8 backends drift slightly and are opt-in.
+BACKENDS = ('auto', 'default', 'onnx', 'onnx-int8', 'quantized')
+
+# Embedded when an index is exported and again by any model about to query it.
+# A faithful backend of the same model lands close to 1; a different model's
+# vectors live in another space and land near 0.
+PROBE_TEXT = "Community members share what they have learned so that others can act on it"
+PROBE_MIN_COSINE = 0.9
+
+
+def hub_name(model_name):
+    return model_name if '/' in model_name else f"sentence-transformers/{model_name}"
+
+
+def _installed(*modules):
+    return all(importlib.util.find_spec(module) is not None for module in modules)
+
+
+def onnx_export_info(model_dir=ONNX_MODEL_DIR):
+    """{'model', 'dim'} recorded by export_onnx(), or None for a missing or unlabelled export"""
+    try:
+        with open(Path(model_dir) / "export.json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def same_model(name, other):
+    return hub_name(name) == hub_name(other)
+
+
+def resolve_backend(backend='auto', model_dir=ONNX_MODEL_DIR, model_name=DEFAULT_EMBEDDING_MODEL):
+    """The concrete backend 'auto' stands for on this machine"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    if backend != 'auto':
+        return backend
+    info = onnx_export_info(model_dir)
+    if (info is not None and same_model(info['model'], model_name) and (Path(model_dir) / "model.onnx").exists()
+            and _installed('onnxruntime', 'tokenizers')):
+        return 'onnx'
+    return 'default'
+
+
+def backend_model_name(model_name, backend):
+    """Embedding-cache identity: vectors from a drifting backend must not share keys"""
+    return model_name if backend in ('auto', 'default', 'onnx') else f"{model_name}+{backend}"
+
+
+def check_embedder(model, expected):
+    """model, if it reproduces the vectors an index manifest describes; ValueError otherwise
+
+    expected is an export manifest: 'dim' is always compared, and 'probe' (the
+    exporting model's vector for PROBE_TEXT) when the export recorded one.
+    """
+    vector = np.asarray(model.encode([PROBE_TEXT]), dtype=np.float32)[0]
+    name = getattr(model, 'model_name', type(model).__name__)
+    if expected.get('dim') and vector.shape[0] != expected['dim']:
+        raise ValueError(f"{name} makes {vector.shape[0]}-dim vectors but the index holds {expected['dim']}-dim ones")
+    probe = expected.get('probe')
+    if probe is not None:
+        probe = np.asarray(probe, dtype=np.float32)
+        cosine = float(vector @ probe / max(np.linalg.norm(vector) * np.linalg.norm(probe), 1e-12))
+        if cosine < PROBE_MIN_COSINE:
+            raise ValueError(f"{name} does not reproduce the index's vectors (probe cosine {cosine:.3f}); "
+                             f"the collection was embedded with {expected.get('model')}")
+    return model
+
+
+class OnnxEmbedder:
+    """Sentence embeddings from an exported ONNX transformer via onnxruntime
+
+    Mean pooling and L2 normalization match the SentenceTransformer pipeline,
+    so vectors drop into the existing collection. Texts are sorted by token
+    count before batching and each batch is padded only to its own longest
+    text, which keeps short queries from paying for long transcript chunks.
+    """
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, quantized=False, threads=None, batch_size=32, max_length=256,
+                 model_name=DEFAULT_EMBEDDING_MODEL):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        info = onnx_export_info(model_dir)
+        if info is None or not same_model(info['model'], model_name):
+            exported = info['model'] if info else "an unlabelled model"
+            raise ValueError(f"{model_dir} holds an ONNX export of {exported}, not {model_name}; "
+                             f"re-run export_onnx({model_name!r})")
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads or os.cpu_count() or 1
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_file = model_dir / ("model.int8.onnx" if quantized else "model.onnx")
+        self.session = onnxruntime.InferenceSession(str(model_file), options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.no_padding()
+        self.batch_size = batch_size
+        self.model_name = backend_model_name(model_name, 'onnx-int8' if quantized else 'onnx')
+
+    def _run(self, encodings):
+        width = max(len(e.ids) for e in encodings)
+        input_ids = np.zeros((len(encodings), width), dtype=np.int64)
+        attention_mask = np.zeros_like(input_ids)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+        feed = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self.input_names:
+            feed['token_type_ids'] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feed)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def encode(self, texts, batch_size=None):
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        batch_size = batch_size or self.batch_size
+        encodings = self.tokenizer.encode_batch(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(encodings[i].ids))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            for i, vector in zip(batch, self._run([encodings[i] for i in batch])):
+                vectors[i] = vector
+        return np.stack(vectors)
+
+
+class QuantizedEmbedder:
+    """The SentenceTransformer with its Linear layers dynamically quantized to int8 (needs torch)"""
+
+    def __init__(self, model_name=DEFAULT_EMBEDDING_MODEL, threads=None, batch_size=32):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        model = SentenceTransformer(model_name, device='cpu')
+        self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.batch_size = batch_size
+        self.model_name = backend_model_name(model_name, 'quantized')
+
+    def encode(self, texts, batch_size=None):
+        # SentenceTransformer.encode already sorts by length and pads per batch
+        return self.model.encode(list(texts), batch_size=batch_size or self.batch_size,
+                                 normalize_embeddings=True, convert_to_numpy=True)
+
+
+class DefaultEmbedder:
+    """The stock SentenceTransformer, with an optional torch thread count"""
+
+    def __init__(self, model_name=DEFAULT_EMBEDDING_MODEL, threads=None, batch_size=32):
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device='cpu')
+        self.batch_size = batch_size
+        self.model_name = model_name
+
+    def encode(self, texts, batch_size=None):
+        return self.model.encode(list(texts), batch_size=batch_size or self.batch_size,
+                                 normalize_embeddings=True, convert_to_numpy=True)
+
+
+def load_embedder(model_name=DEFAULT_EMBEDDING_MODEL, backend='auto', threads=None, model_dir=ONNX_MODEL_DIR):
+    """An object with encode(texts) and model_name for the chosen backend"""
+    backend = resolve_backend(backend, model_dir, model_name)
+    if backend in ('onnx', 'onnx-int8'):
+        return OnnxEmbedder(model_dir, quantized=backend == 'onnx-int8', threads=threads, model_name=model_name)
+    if backend == 'quantized':
+        return QuantizedEmbedder(model_name, threads)
+    return DefaultEmbedder(model_name, threads)
+
+
+def export_onnx(model_name=DEFAULT_EMBEDDING_MODEL, model_dir=ONNX_MODEL_DIR, opset=17):
+    """Export the transformer to model.onnx plus a dynamically quantized model.int8.onnx
+
+    Needs torch, transformers, onnx and onnxruntime - only on the machine doing
+    the export; running the result needs just onnxruntime and tokenizers.
+    export.json records which model it is, so it is never mistaken for another.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    model_dir = Path(model_dir)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(hub_name(model_name))
+    model = AutoModel.from_pretrained(hub_name(model_name)).eval()
+    sample = tokenizer(["community knowledge"], return_tensors='pt')
+    names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    axes = {name: {0: 'batch', 1: 'sequence'} for name in names}
+    with torch.no_grad():
+        torch.onnx.export(model, ({name: sample[name] for name in names},), str(model_dir / "model.onnx"),
+                          input_names=names, output_names=['last_hidden_state'],
+                          dynamic_axes={**axes, 'last_hidden_state': {0: 'batch', 1: 'sequence'}},
+                          opset_version=opset)
+    tokenizer.save_pretrained(str(model_dir))
+    quantize_dynamic(str(model_dir / "model.onnx"), str(model_dir / "model.int8.onnx"), weight_type=QuantType.QInt8)
+    with open(model_dir / "export.json", 'w') as f:
+        json.dump({'model': model_name, 'dim': model.config.hidden_size}, f)
+    return model_dir
+
+
+SAMPLE_SENTENCES = [
+    "Youth groups in Kibera organize clean-up days every month",
+    "We need skills training for women running small businesses",
+    "The baraza meeting decided to map the water points together",
+    "Media uploads help us document evictions and keep records",
+    "Savings groups pool money so members can start enterprises",
+    "Barriers to organizing include lack of meeting space and funds",
+    "Community health volunteers visit households door to door",
+    "Land tenure is the biggest worry for families in informal settlements",
+]
+
+
+if __name__ == "__main__":
+    # Benchmark: texts/sec per backend and cosine drift against the stock model
+    # usage: python embedding_backends.py [texts] [threads] [model] [onnx model dir]
+    import sys
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    model_name = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_EMBEDDING_MODEL
+    model_dir = sys.argv[4] if len(sys.argv) > 4 else ONNX_MODEL_DIR
+    rng = np.random.default_rng(3)
+    words = " ".join(SAMPLE_SENTENCES).split()
+    texts = [" ".join(rng.choice(words, rng.integers(6, 120))) for _ in range(count)]
+
+    print("🏎️ EMBEDDING BACKEND BENCHMARK")
+    print("=" * 50)
+    print(f"📝 {count} texts of 6-120 words, {threads} threads")
+
+    # ONNX first, so its load time isn't flattered by torch already being imported
+    results = {}
+    for backend in ('onnx', 'onnx-int8', 'default', 'quantized'):
+        start = time.perf_counter()
+        try:
+            embedder = load_embedder(model_name, backend, threads, model_dir)
+            embedder.encode(texts[:8])
+        except (ImportError, OSError, ValueError) as e:
+            print(f"⏭️ {backend:10s} skipped ({e})")
+            continue
+        loaded = time.perf_counter() - start
+        start = time.perf_counter()
+        vectors = np.asarray(embedder.encode(texts), dtype=np.float32)
+        results[backend] = (loaded, count / (time.perf_counter() - start), vectors)
+
+    reference = results.get('default', (None, None, None))[2]
+    for backend, (loaded, rate, vectors) in results.items():
+        drift = ""
+        if reference is not None:
+            cosine = (vectors * reference).sum(axis=1)
+            drift = f", cosine vs default mean {cosine.mean():.5f} min {cosine.min():.5f}"
+        print(f"⚡ {backend:10s} loaded in {loaded:5.2f}s, {rate:8.1f} texts/sec{drift}")
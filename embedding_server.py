@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+🔌 COMMUNITY DATA COMMONS - EMBEDDING SERVER
+One embedding model per machine, shared by every hub process over a Unix socket
+"""
+
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+import socketserver
+from pathlib import Path
+
+import numpy as np
+
+WORKSPACE_PATH = Path("/home/yethatsjames/community-ai-workspace")
+SOCKET_PATH = WORKSPACE_PATH / "run" / "embedding.sock"
+
+_LENGTH = struct.Struct('>I')
+
+
+def _send(sock, header, body=b''):
+    payload = json.dumps(header).encode('utf-8')
+    sock.sendall(_LENGTH.pack(len(payload)) + payload + body)
+
+
+def _receive_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Embedding server connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _receive(sock):
+    (size,) = _LENGTH.unpack(_receive_exactly(sock, _LENGTH.size))
+    return json.loads(_receive_exactly(sock, size))
+
+
+class _Request:
+    __slots__ = ('texts', 'done', 'vectors', 'error')
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.done = threading.Event()
+        self.vectors = None
+        self.error = None
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    # Unix sockets refuse connections outright once the backlog is full
+    request_queue_size = 128
+
+
+class EmbeddingServer:
+    """Owns the embedding model and embeds requests from many clients in shared batches
+
+    Each connection gets a handler thread that queues its texts. One batching
+    thread waits for a request, keeps collecting for up to max_wait_ms (or
+    until max_batch texts), runs the model once over everything collected and
+    hands each caller its slice. Under concurrent users that turns many
+    one-query model calls into a few batched ones.
+
+    Wire format, both directions: 4-byte big-endian length + JSON header.
+    {"op": "embed", "texts": [...]} is answered by {"count", "dim"} followed
+    by count * dim float32 values; "info" and "stats" return a header only.
+    """
+
+    def __init__(self, model, socket_path=SOCKET_PATH, max_batch=64, max_wait_ms=5):
+        self.model = model
+        self.model_name = getattr(model, 'model_name', None) or type(model).__name__
+        self.socket_path = Path(socket_path)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._server = None
+        self._batcher = None
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+
+    def embed(self, texts):
+        """Queue texts for the next batch and wait for their vectors"""
+        request = _Request(list(texts))
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise RuntimeError(request.error)
+        return request.vectors
+
+    def _collect(self):
+        """The next batch of requests, or None once stop() has been called"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # finish this batch, stop on the next
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _batch_loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            texts = [text for request in batch for text in request.texts]
+            try:
+                vectors = np.asarray(self.model.encode(texts), dtype=np.float32).reshape(len(texts), -1)
+            except Exception as e:
+                vectors, error = None, f"{type(e).__name__}: {e}"
+            else:
+                error = None
+            start = 0
+            for request in batch:
+                if error is None:
+                    request.vectors = vectors[start:start + len(request.texts)]
+                request.error = error
+                start += len(request.texts)
+                request.done.set()
+            self.requests += len(batch)
+            self.texts += len(texts)
+            self.batches += 1
+
+    def stats(self):
+        return {'model': self.model_name, 'requests': self.requests, 'texts': self.texts, 'batches': self.batches,
+                'texts_per_batch': self.texts / self.batches if self.batches else 0.0}
+
+    def start(self):
+        """Bind the socket and serve on background threads"""
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            if ping(self.socket_path):
+                raise RuntimeError(f"An embedding server is already listening on {self.socket_path}")
+            self.socket_path.unlink()  # left behind by a server that died
+
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                try:
+                    self.serve()
+                except OSError:
+                    return  # the client hung up, e.g. after timing out
+
+            def serve(self):
+                while True:
+                    message = _receive(self.request)
+                    op = message.get('op')
+                    if op == 'embed':
+                        try:
+                            vectors = server.embed(message.get('texts', []))
+                        except RuntimeError as e:
+                            _send(self.request, {'error': str(e)})
+                            continue
+                        _send(self.request, {'count': int(vectors.shape[0]), 'dim': int(vectors.shape[1])},
+                              vectors.tobytes())
+                    elif op == 'info':
+                        _send(self.request, {'model': server.model_name})
+                    elif op == 'stats':
+                        _send(self.request, server.stats())
+                    else:
+                        _send(self.request, {'error': f"Unknown op: {op}"})
+
+        self._server = _UnixServer(str(self.socket_path), Handler)
+        self._batcher = threading.Thread(target=self._batch_loop, name="embedding-batcher", daemon=True)
+        self._batcher.start()
+        threading.Thread(target=self._server.serve_forever, name="embedding-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._queue.put(None)
+            self.socket_path.unlink(missing_ok=True)
+            self._server = None
+
+
+class EmbeddingClient:
+    """Model stand-in (encode, model_name) that embeds through the EmbeddingServer
+
+    Each thread keeps its own connection. Any socket error - including a
+    timeout, which can leave a late reply unread on the stream - closes that
+    connection, and the request is retried once on a fresh one, so a reply is
+    never matched to the wrong request.
+    """
+
+    def __init__(self, socket_path=SOCKET_PATH, timeout=60):
+        self.socket_path = Path(socket_path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self.model_name = self._call({'op': 'info'})[0]['model']
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(str(self.socket_path))
+            self._local.sock = sock
+        return sock
+
+    def _call(self, message):
+        for attempt in (1, 2):
+            try:
+                sock = self._connection()
+                _send(sock, message)
+                header = _receive(sock)
+                body = _receive_exactly(sock, header['count'] * header['dim'] * 4) if 'count' in header else b''
+                break
+            except OSError:  # includes ConnectionError and socket.timeout
+                sock = getattr(self._local, 'sock', None)
+                if sock is not None:
+                    sock.close()
+                self._local.sock = None
+                if attempt == 2:
+                    raise
+        if 'error' in header:
+            raise RuntimeError(f"Embedding server: {header['error']}")
+        return header, body
+
+    def encode(self, texts):
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        header, body = self._call({'op': 'embed', 'texts': texts})
+        return np.frombuffer(body, dtype=np.float32).reshape(header['count'], header['dim'])
+
+    def stats(self):
+        return self._call({'op': 'stats'})[0]
+
+
+def ping(socket_path=SOCKET_PATH):
+    """True if an embedding server answers on socket_path"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1)
+            sock.connect(str(socket_path))
+            _send(sock, {'op': 'info'})
+            return 'model' in _receive(sock)
+    except (OSError, ValueError):
+        return False
+
+
+def connect_embedder(socket_path=SOCKET_PATH):
+    """An EmbeddingClient if the server is running, else None (callers load their own model)"""
+    if not Path(socket_path).exists() or not ping(socket_path):
+        return None
+    return EmbeddingClient(socket_path)
+
+
+def wait_until_ready(timeout=120, socket_path=SOCKET_PATH):
+    """True once the server answers - it only listens after its model has loaded"""
+    deadline = time.monotonic() + timeout
+    while not ping(socket_path):
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.5)
+    return True
+
+
+def server_needed():
+    """True if an app here would embed through the server instead of holding its own model
+
+    Only MappedRAG (a current mapped export) has no model of its own. Apps
+    serving Chroma keep CommunityRAG's SentenceTransformer loaded anyway, so
+    a server would be one more copy rather than a shared one.
+    """
+    from ann_index import open_vector_index
+    from mapped_rag import export_is_current
+    from vector_index import VECTOR_INDEX_DIR
+    try:
+        index = open_vector_index(VECTOR_INDEX_DIR)
+    except (FileNotFoundError, ValueError):
+        return False
+    return index.has_records and export_is_current(index)
+
+
+if __name__ == "__main__":
+    # python embedding_server.py [serve|benchmark] [model] [backend] [threads]
+    #        embedding_server.py needed      exit status 0 if an app would use the server
+    #        embedding_server.py wait [s]    exit status 0 once the server answers
+    import sys
+    from concurrent.futures import ThreadPoolExecutor
+    from embedding_backends import DEFAULT_EMBEDDING_MODEL, SAMPLE_SENTENCES, load_embedder
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'serve'
+    if command == 'needed':
+        sys.exit(0 if server_needed() else 1)
+    if command == 'wait':
+        sys.exit(0 if wait_until_ready(float(sys.argv[2]) if len(sys.argv) > 2 else 120) else 1)
+    model_name = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_EMBEDDING_MODEL
+    backend = sys.argv[3] if len(sys.argv) > 3 else 'auto'
+    threads = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    if command == 'serve' and ping():
+        print(f"🔌 Embedding server already running on {SOCKET_PATH}")
+        sys.exit(0)
+    model = load_embedder(model_name, backend, threads)
+
+    if command == 'serve':
+        server = EmbeddingServer(model).start()
+        print(f"🔌 Embedding server ({server.model_name}) listening on {server.socket_path}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.stop()
+
+    elif command == 'benchmark':
+        # Concurrent single-question clients: one model call each vs micro-batched through the server
+        import tempfile
+        users, per_user = 16, 16
+        questions = [f"{SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)]} ({i})" for i in range(users * per_user)]
+        model.encode(questions[:8])
+
+        print("🔌 EMBEDDING SERVER BENCHMARK")
+        print("=" * 50)
+        print(f"👥 {users} concurrent users x {per_user} questions")
+        lock = threading.Lock()
+
+        def direct(user):
+            for question in questions[user::users]:
+                with lock:  # one shared in-process model, one call at a time
+                    model.encode([question])
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(users) as pool:
+            list(pool.map(direct, range(users)))
+        direct_rate = len(questions) / (time.perf_counter() - start)
+        print(f"🐢 one call per question: {direct_rate:8.1f} questions/sec")
+
+        with tempfile.TemporaryDirectory() as run_dir:
+            server = EmbeddingServer(model, Path(run_dir) / "embedding.sock").start()
+            client = EmbeddingClient(server.socket_path)
+
+            def served(user):
+                for question in questions[user::users]:
+                    client.encode([question])
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(users) as pool:
+                list(pool.map(served, range(users)))
+            served_rate = len(questions) / (time.perf_counter() - start)
+            stats = client.stats()
+            server.stop()
+        print(f"⚡ micro-batched server:  {served_rate:8.1f} questions/sec, "
+              f"{stats['texts_per_batch']:.1f} questions per model call")
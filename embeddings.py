@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+🔢 COMMUNITY DATA COMMONS - EMBEDDINGS
+Batched embedding and a persistent query-embedding cache
+"""
+
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from pathlib import Path
+
+WORKSPACE_PATH = Path("/home/yethatsjames/community-ai-workspace")
+EMBEDDING_CACHE_FILE = WORKSPACE_PATH / "vector-db" / "query_embeddings.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used);
+"""
+
+
+def model_embedder(model):
+    """(name, embed) for a SentenceTransformer-style object with encode()"""
+    name = getattr(model, 'model_name', None) or type(model).__name__
+    return str(name), lambda texts: [list(map(float, v)) for v in model.encode(list(texts))]
+
+
+def resolve_embedder(rag):
+    """Find the function CommunityRAG embeds with: texts -> list of vectors
+
+    Prefers a SentenceTransformer-style model held by the RAG and falls back to
+    the Chroma collection's embedding function. Returns (name, embed) or
+    (None, None) when neither is exposed.
+    """
+    for attribute in ('model', 'embedding_model', 'encoder'):
+        model = getattr(rag, attribute, None)
+        if model is not None and hasattr(model, 'encode'):
+            return model_embedder(model)
+
+    function = getattr(getattr(rag, 'collection', None), '_embedding_function', None)
+    if function is not None:
+        name = getattr(function, 'MODEL_NAME', None) or type(function).__name__
+        return str(name), lambda texts: [list(map(float, v)) for v in function(list(texts))]
+    return None, None
+
+
+class EmbeddingCache:
+    """Content-hashed, on-disk cache of query embeddings with least-recently-used eviction
+
+    Keys hash the model name together with the text, so switching models can
+    never serve a stale vector. Vectors are stored as packed float32.
+    """
+
+    def __init__(self, db_path=EMBEDDING_CACHE_FILE, max_entries=50000):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(model_name, text):
+        return hashlib.sha256(f"{model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys):
+        """{key: vector} for every cached key"""
+        if not keys:
+            return {}
+        conn = self._connection()
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for key, blob in rows:
+                found[key] = array('f', blob).tolist()
+        if found:
+            with conn:
+                conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                 ((time.time(), key) for key in found))
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Store (key, vector) pairs, then evict the least recently used beyond max_entries"""
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                             ((key, array('f', vector).tobytes(), now) for key, vector in items))
+            excess = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute("DELETE FROM embeddings WHERE key IN "
+                             "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        size = self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0, 'size': size}
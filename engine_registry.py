@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+⚙️ COMMUNITY DATA COMMONS - ENGINE REGISTRY
+Process-wide engines shared by every Streamlit session
+"""
+
+import sys
+import threading
+import functools
+
+# Engines live with the rest of the community AI scripts
+sys.path.append('/home/yethatsjames/community-ai-workspace/scripts')
+
+
+class SerializedEngine:
+    """Proxy that lets one thread at a time into an engine that isn't thread-safe"""
+
+    def __init__(self, engine):
+        self._engine = engine
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self._engine, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attribute(*args, **kwargs)
+        return locked
+
+
+class EngineRegistry:
+    """Builds each engine once per process and hands the same instance to every session
+
+    Embedding models and the Chroma client are loaded once instead of once per
+    browser session. Construction is guarded per engine, so concurrent sessions
+    asking for the same engine wait for one build rather than starting their own.
+    warm_up() builds engines on a background thread so the first visitor doesn't.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._engines = {}
+        self._locks = {}
+        self._warm_up_thread = None
+
+    def register(self, name, factory, serialize=False):
+        """Register a zero-argument factory; serialize=True for engines that aren't thread-safe"""
+        self._factories[name] = (factory, serialize)
+        self._locks[name] = threading.Lock()
+
+    def is_loaded(self, name):
+        return name in self._engines
+
+    def get(self, name):
+        """The shared engine, building it on first use (build errors propagate and are retried next call)"""
+        engine = self._engines.get(name)
+        if engine is not None:
+            return engine
+        with self._locks[name]:
+            if name not in self._engines:
+                factory, serialize = self._factories[name]
+                engine = factory()
+                self._engines[name] = SerializedEngine(engine) if serialize else engine
+        return self._engines[name]
+
+    def warm_up(self, names=None, background=True):
+        """Build engines ahead of the first request, by default on a daemon thread"""
+        names = list(names or self._factories)
+
+        def build_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"⚠️ Warm-up could not load {name}: {e}")
+
+        if not background:
+            build_all()
+            return None
+        if self._warm_up_thread is None or not self._warm_up_thread.is_alive():
+            self._warm_up_thread = threading.Thread(target=build_all, name="engine-warm-up", daemon=True)
+            self._warm_up_thread.start()
+        return self._warm_up_thread
+
+
+# Cross-encoder re-ranking of insight queries. Off by default: on a laptop CPU
+# most queries exceed the time budget and fall back (see reranker.py)
+RERANK_INSIGHTS = False
+
+
+def _vector_index():
+    """The quantized index exported next to the vector database, if there is one and it is current"""
+    from ann_index import open_vector_index
+    from mapped_rag import export_is_current
+    from vector_index import VECTOR_INDEX_DIR
+    if (VECTOR_INDEX_DIR / "manifest.json").exists():
+        index = open_vector_index(VECTOR_INDEX_DIR)
+        if export_is_current(index):
+            return index
+    return None
+
+
+def _insights_engine():
+    from actionable_insights import ActionableInsightsEngine
+    from knowledge_base import CachedKnowledgeBase
+    from mapped_rag import embedder_reference, verified_client
+    from reranker import load_reranker
+    # CommunityRAG (privacy_rag) still loads its own SentenceTransformer when the
+    # engine is built; a shared server (if START_GUI.sh started one) only takes
+    # over the query embeddings
+    engine = ActionableInsightsEngine()
+    # Action plans are built from the top 5 chunks, so they get re-ranked ones when enabled
+    engine.rag = CachedKnowledgeBase(engine.rag, vector_index=_vector_index(),
+                                     model=verified_client(embedder_reference(engine.rag)),
+                                     reranker=load_reranker() if RERANK_INSIGHTS else None)
+    return engine
+
+
+def _media_processor():
+    from media_processor import MediaProcessor
+    return MediaProcessor()
+
+
+def _multimodal_engine():
+    from multimodal_engine import MultiModalEngine
+    return MultiModalEngine()
+
+
+def _rag_system():
+    from mapped_rag import open_knowledge_base
+    return open_knowledge_base()
+
+
+def _analytics_runner():
+    from analytics_jobs import AnalyticsRunner
+    return AnalyticsRunner()
+
+
+registry = EngineRegistry()
+# Chroma reads and embedding inference are safe to share between threads; the
+# media engines write files and keep per-job state, so they take turns
+registry.register('insights', _insights_engine)
+registry.register('rag', _rag_system)
+registry.register('analytics', _analytics_runner)
+registry.register('media', _media_processor, serialize=True)
+registry.register('multimodal', _multimodal_engine, serialize=True)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+📥 COMMUNITY DATA COMMONS - INGEST PIPELINE
+Parallel, batched re-indexing of transcripts/*.json into the knowledge base
+"""
+
+import os
+import json
+import time
+import hmac
+import hashlib
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from vector_index import iter_collection
+
+WORKSPACE_PATH = Path("/home/yethatsjames/community-ai-workspace")
+TRANSCRIPTS_DIR = WORKSPACE_PATH / "transcripts"
+PARTICIPANT_KEY_FILE = WORKSPACE_PATH / ".participant_key"
+
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+
+
+def transcript_text(data):
+    """The spoken text of a transcript file: plain text, a text field, or a list of segments"""
+    if isinstance(data, str):
+        return data
+    if isinstance(data, list):
+        return ' '.join(transcript_text(item) for item in data).strip()
+    if isinstance(data, dict):
+        for key in ('text', 'transcript', 'content'):
+            if isinstance(data.get(key), str):
+                return data[key]
+        if isinstance(data.get('segments'), list):
+            return transcript_text(data['segments'])
+    return ''
+
+
+def chunk_text(text, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Overlapping windows of chunk_words words"""
+    words = text.split()
+    step = max(1, chunk_words - overlap)
+    return [' '.join(words[start:start + chunk_words])
+            for start in range(0, max(len(words) - overlap, 1), step) if words[start:start + chunk_words]]
+
+
+def participant_key(key_file=PARTICIPANT_KEY_FILE):
+    """The workspace's secret participant-hashing key, created on first use"""
+    key_file = Path(key_file)
+    if not key_file.exists():
+        key_file.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            descriptor = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass  # another ingest created it first
+        else:
+            with os.fdopen(descriptor, 'wb') as f:
+                f.write(os.urandom(32))
+    return key_file.read_bytes()
+
+
+def read_transcript(path, key, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """(ids, documents, metadatas) for one transcript file
+
+    Ids are <file stem>_<chunk number> and every chunk records its source
+    file, which ingest_transcripts() uses to replace a file's old chunks.
+    A file with no transcript text raises ValueError like an unreadable one,
+    so it is reported rather than silently indexed as nothing.
+    Participants are stored as an HMAC-SHA256 under the workspace key, never
+    by name - without the key, candidate names can't be hashed and compared.
+    """
+    path = Path(path)
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    info = data if isinstance(data, dict) else {}
+    community = info.get('community') or 'Unknown'
+    participant = str(info.get('participant') or info.get('speaker') or path.stem)
+    participant_id = info.get('participant_id') or hmac.new(
+        key, participant.encode('utf-8'), hashlib.sha256).hexdigest()[:16]
+
+    documents = chunk_text(transcript_text(data), chunk_words, overlap)
+    if not documents:
+        raise ValueError("no transcript text (expected text, transcript, content or segments)")
+    ids = [f"{path.stem}_{i}" for i in range(len(documents))]
+    metadatas = [{'community': community, 'participant_id': participant_id, 'source': path.name, 'chunk': i}
+                 for i in range(len(documents))]
+    return ids, documents, metadatas
+
+
+def read_transcripts(paths, key, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Chunks for a group of files plus (file name, error) for unreadable ones; runs in a worker process"""
+    ids, documents, metadatas, failed = [], [], [], []
+    for path in paths:
+        try:
+            file_ids, file_documents, file_metadatas = read_transcript(path, key, chunk_words, overlap)
+        except (OSError, ValueError) as e:
+            failed.append((Path(path).name, str(e)))
+            continue
+        ids.extend(file_ids)
+        documents.extend(file_documents)
+        metadatas.extend(file_metadatas)
+    return ids, documents, metadatas, failed
+
+
+def iter_chunked(paths, key, workers=None, files_per_task=8, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Yield read_transcripts() results for groups of files as a process pool finishes them
+
+    At most two groups per worker are in flight, so reading runs ahead of the
+    consumer (embedding) without loading the whole transcript folder.
+    """
+    groups = [paths[i:i + files_per_task] for i in range(0, len(paths), files_per_task)]
+    workers = min(workers or os.cpu_count() or 1, len(groups) or 1)
+    if workers == 1:
+        for group in groups:
+            yield read_transcripts(group, key, chunk_words, overlap)
+        return
+
+    pending = set()
+    # spawn: forking a multi-threaded server process can deadlock the children
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        for group in groups:
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(pool.submit(read_transcripts, group, key, chunk_words, overlap))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def ingest_transcripts(kb, paths=None, workers=None, batch_size=256, flush_size=2048, files_per_task=8,
+                       key=None, replace_foreign=False, progress=print):
+    """Re-index transcripts into a CachedKnowledgeBase, reporting documents/sec
+
+    Files are read and chunked in worker processes while the main process
+    embeds: chunks from many files are pooled until flush_size, then go
+    through kb.add_documents(), which embeds batch_size at a time (through
+    the shared embedding server when kb uses it) and upserts each batch in
+    one call. The theme index attached to kb is updated as batches land.
+
+    A file's chunks from an earlier run that the new chunking no longer
+    produces are deleted as its new ones land. Without explicit paths this is
+    a full re-index of TRANSCRIPTS_DIR: once every file is in, chunks this
+    pipeline wrote for files that are gone are deleted too. Chunks without
+    the pipeline's source metadata (CommunityRAG's own, chunked and hashed
+    differently) are only deleted with replace_foreign=True. The sweep is
+    skipped - and stats['swept'] is False - when any file failed or nothing
+    was written, so a bad run can never empty the knowledge base.
+    """
+    full = paths is None
+    paths = sorted(Path(p) for p in (TRANSCRIPTS_DIR.glob("*.json") if full else paths))
+    key = key or participant_key()
+    start = time.perf_counter()
+    stats = {'files': len(paths), 'chunks': 0, 'removed': 0, 'failed': [], 'swept': False,
+             'embed_upsert_seconds': 0.0}
+    ids, documents, metadatas = [], [], []
+    written = set()
+
+    def flush():
+        flush_start = time.perf_counter()
+        kb.add_documents(ids, documents, metadatas, batch_size=batch_size)
+        sources = sorted({metadata['source'] for metadata in metadatas})
+        previous = kb.rag.collection.get(where={'source': {'$in': sources}}, include=[])['ids']
+        stats['removed'] += kb.delete_documents(set(previous) - set(ids))
+        stats['embed_upsert_seconds'] += time.perf_counter() - flush_start
+        stats['chunks'] += len(ids)
+        if full:
+            written.update(ids)
+        del ids[:], documents[:], metadatas[:]
+        if progress:
+            elapsed = time.perf_counter() - start
+            progress(f"📥 {stats['chunks']:,} chunks indexed, {stats['chunks'] / elapsed:,.0f} docs/sec")
+
+    for group_ids, group_documents, group_metadatas, failed in iter_chunked(paths, key, workers, files_per_task):
+        ids.extend(group_ids)
+        documents.extend(group_documents)
+        metadatas.extend(group_metadatas)
+        stats['failed'].extend(failed)
+        if len(ids) >= flush_size:
+            flush()
+    if ids:
+        flush()
+    if full and written and not stats['failed']:
+        # Collect first: deleting while paging would shift the offsets
+        stale = [doc_id for page in iter_collection(kb.rag.collection, include=('metadatas',))
+                 for doc_id, metadata in zip(page['ids'], page['metadatas'])
+                 if doc_id not in written and (replace_foreign or (metadata or {}).get('source'))]
+        stats['removed'] += kb.delete_documents(stale)
+        stats['swept'] = True
+
+    stats['seconds'] = time.perf_counter() - start
+    stats['docs_per_sec'] = stats['chunks'] / stats['seconds'] if stats['seconds'] else 0.0
+    stats['files_per_sec'] = len(paths) / stats['seconds'] if stats['seconds'] else 0.0
+    return stats
+
+
+def ingest_knowledge_base():
+    """A CachedKnowledgeBase over CommunityRAG's Chroma collection (never the read-only mapped export)"""
+    from knowledge_base import CachedKnowledgeBase
+    from mapped_rag import embedder_reference, query_model
+    from privacy_rag import CommunityRAG
+    from theme_index import ThemeIndex
+    rag = CommunityRAG()
+    return CachedKnowledgeBase(rag, model=query_model(embedder_reference(rag)), theme_index=ThemeIndex())
+
+
+def synthetic_transcripts(directory, count, seed=11):
+    """Transcript files of 1-8 segments of 40-200 words, for the benchmark"""
+    import random
+    from theme_counter import synthetic_documents
+    rng = random.Random(seed)
+    directory = Path(directory)
+    segments = synthetic_documents(count * 8, seed)
+    for i in range(count):
+        with open(directory / f"interview_{i:05d}.json", 'w') as f:
+            json.dump({'community': f"Community {i % 12}", 'participant': f"speaker {i}",
+                       'segments': [{'text': text} for text in segments[i * 8:i * 8 + rng.randint(1, 8)]]}, f)
+    return sorted(directory.glob("*.json"))
+
+
+if __name__ == "__main__":
+    # python ingest_pipeline.py [ingest [workers] [--replace-foreign] | benchmark [files]]
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'ingest'
+
+    if command == 'ingest':
+        from mapped_rag import export_knowledge_base
+        from vector_index import VECTOR_INDEX_DIR
+        arguments = [argument for argument in sys.argv[2:] if argument != '--replace-foreign']
+        workers = int(arguments[0]) if arguments else None
+        kb = ingest_knowledge_base()
+        stats = ingest_transcripts(kb, workers=workers, replace_foreign='--replace-foreign' in sys.argv)
+        print(f"✅ {stats['files']:,} transcripts -> {stats['chunks']:,} chunks in {stats['seconds']:.1f}s "
+              f"({stats['docs_per_sec']:,.0f} docs/sec, {stats['embed_upsert_seconds']:.1f}s embedding + upserting)")
+        print(f"🧹 {stats['removed']:,} superseded chunks removed")
+        for name, error in stats['failed']:
+            print(f"⚠️ Skipped {name} ({error}) - its older chunks were kept; fix the file and re-run")
+        if not stats['swept']:
+            print("⚠️ Chunks of deleted transcripts were kept: the run failed on some files or wrote nothing")
+        if (VECTOR_INDEX_DIR / "manifest.json").exists():
+            export_knowledge_base(kb)
+            print(f"🗺️ Re-exported the mapped index in {VECTOR_INDEX_DIR}")
+
+    elif command == 'benchmark':
+        # Read + chunk stage: one file at a time vs the worker pool
+        import tempfile
+
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+        print("📥 INGEST PIPELINE BENCHMARK")
+        print("=" * 50)
+        with tempfile.TemporaryDirectory() as directory:
+            paths = synthetic_transcripts(directory, count)
+            start = time.perf_counter()
+            key = os.urandom(32)
+            serial = [read_transcript(path, key) for path in paths]
+            serial_time = time.perf_counter() - start
+            chunks = sum(len(ids) for ids, _, _ in serial)
+            print(f"📝 {count:,} transcripts, {chunks:,} chunks, {os.cpu_count()} CPUs")
+            print(f"🐢 one file at a time: {serial_time:6.2f}s ({chunks / serial_time:8,.0f} docs/sec)")
+            for workers in sorted({2, 4, os.cpu_count() or 1}):
+                start = time.perf_counter()
+                pooled = sum(len(ids) for ids, _, _, _ in iter_chunked(paths, key, workers))
+                pooled_time = time.perf_counter() - start
+                print(f"⚡ {workers:2d} worker processes: {pooled_time:6.2f}s ({pooled / pooled_time:8,.0f} docs/sec)")
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+🧠 COMMUNITY DATA COMMONS - KNOWLEDGE BASE
+Performance layer around CommunityRAG
+"""
+
+import copy
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from embeddings import EmbeddingCache, model_embedder, resolve_embedder
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from vector_index import _normalize, iter_collection
+
+SEARCH_MODES = ('auto', 'vector', 'hybrid', 'lexical')
+# How long a Chroma write by another process can go unnoticed by collection_version()
+FINGERPRINT_SECONDS = 1.0
+
+# Chroma distance -> cosine similarity, by hnsw:space. l2 (Chroma's default) is the
+# squared euclidean distance, and l2 and ip only convert for unit-length vectors
+SPACE_SIMILARITY = {
+    'cosine': lambda distance: 1 - distance,
+    'l2': lambda distance: 1 - distance / 2,
+    'ip': lambda distance: 1 - distance,
+}
+
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive form of a question, used as the cache key"""
+    return ' '.join(query.lower().split())
+
+
+class QueryCache:
+    """Bounded LRU cache of query results with a time-to-live
+
+    Entries are tagged with the collection version they were computed against;
+    a different version means the knowledge base changed and the whole cache
+    is dropped. put() can give an entry a shorter TTL than the default.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, version):
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() > entry[0]:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key, version, value, ttl_seconds=None):
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = (time.monotonic() + ttl_seconds, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'size': len(self._entries),
+            'max_entries': self.max_entries
+        }
+
+
+class CachedKnowledgeBase:
+    """Drop-in wrapper for CommunityRAG that caches query results and query embeddings
+
+    Queries are embedded through embed_batch(), which serves repeated questions
+    from the on-disk embedding cache, and then searched directly against the
+    collection, several at a time for query_many(). That direct path reports
+    cosine similarity, converting distances by the collection's hnsw:space
+    (SPACE_SIMILARITY); l2 and ip collections only qualify when their stored
+    vectors are unit length. Otherwise, or if the RAG doesn't expose its
+    embedding model, queries go through CommunityRAG.query_knowledge_base.
+    Passing model (anything with encode(), e.g. from
+    embedding_backends.load_embedder) replaces the RAG's own. Anything not
+    overridden here (collection, the model, ...) passes straight through to
+    the wrapped RAG.
+
+    A BM25 LexicalIndex is built alongside the collection (and rebuilt when the
+    collection changes) for the 'lexical' and 'hybrid' search modes. Hybrid
+    results are ranked by fusing both rankings but always report cosine
+    similarity; it falls back to vector mode when vector hits carry no ids
+    (CommunityRAG's own search) and so can't be fused.
+
+    With a vector_index (vector_index.QuantizedVectorIndex, or ann_index.IVFIndex
+    for large corpora) built for the current collection version, vector search
+    runs against it instead of asking Chroma; a stale index is ignored.
+
+    With a reranker (reranker.CrossEncoderReranker), queries retrieve a wider
+    candidate pool and return its best n_results by cross-encoder score. An
+    answer that fell back to retrieval order (time budget exceeded, model
+    still loading) is cached only for reranker.fallback_ttl_seconds, so a
+    repeated question is served from the cache but gets re-ranked again soon.
+
+    add_documents() and delete_documents() also update theme_index
+    (theme_index.ThemeIndex) when one is attached, keeping the analytics
+    counters current.
+
+    collection_version() includes the Chroma database's write fingerprint
+    (mapped_rag.chroma_fingerprint of db_file), so re-ingesting the same ids
+    or a delete plus add that keeps the count still invalidates the query
+    cache, the BM25 index and vector index freshness. It is re-read at most
+    every FINGERPRINT_SECONDS, and at once after this wrapper writes.
+    """
+
+    def __init__(self, rag, cache=None, embedding_cache=None, batch_size=64, vector_index=None, model=None,
+                 reranker=None, theme_index=None, db_file=None):
+        self.rag = rag
+        self.db_file = db_file
+        self.vector_index = vector_index
+        self.reranker = reranker
+        self.theme_index = theme_index
+        self.cache = cache if cache is not None else QueryCache()
+        self.embedding_cache = embedding_cache if embedding_cache is not None else EmbeddingCache()
+        self.batch_size = batch_size
+        self.model_name, self._embed = model_embedder(model) if model is not None else resolve_embedder(rag)
+        self._lexical = None
+        self._lexical_version = None
+        self._lexical_lock = threading.Lock()
+        self._unit_length = (None, False)
+        self._fingerprint = (0.0, None)
+
+    def __getattr__(self, name):
+        return getattr(self.rag, name)
+
+    def _space(self):
+        metadata = getattr(self.rag.collection, 'metadata', None) or {}
+        return metadata.get('hnsw:space', 'l2')
+
+    def _stored_unit_length(self):
+        """True if the collection's stored vectors are normalized, checked on a few rows per version"""
+        version = self.collection_version()
+        if self._unit_length[0] != version:
+            page = self.rag.collection.get(limit=8, include=['embeddings'])
+            vectors = np.asarray(page['embeddings'], dtype=np.float32).reshape(len(page['ids']), -1)
+            unit = len(vectors) > 0 and bool(np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-3))
+            self._unit_length = (version, unit)
+        return self._unit_length[1]
+
+    def _direct_search(self):
+        """True if vector search may bypass CommunityRAG: an embedder and distances that convert to cosine"""
+        space = self._space()
+        return (self._embed is not None and space in SPACE_SIMILARITY
+                and (space == 'cosine' or self._stored_unit_length()))
+
+    def _collection_fingerprint(self):
+        """The collection's write fingerprint: fixed for a mapped export, read from Chroma's database otherwise"""
+        fingerprint = getattr(self.rag.collection, 'fingerprint', None)
+        if fingerprint is not None:
+            return fingerprint
+        expires, value = self._fingerprint
+        if time.monotonic() >= expires:
+            from mapped_rag import CHROMA_DB_FILE, chroma_fingerprint
+            value = chroma_fingerprint(self.db_file or CHROMA_DB_FILE)
+            self._fingerprint = (time.monotonic() + FINGERPRINT_SECONDS, value)
+        return value
+
+    def collection_version(self):
+        """Changes whenever documents are added to, replaced in or removed from the collection"""
+        return (self.rag.collection.name, self.rag.collection.count(), self._collection_fingerprint())
+
+    def iter_documents(self, batch_size=500, include=('documents', 'metadatas')):
+        """Stream the collection as get() pages of batch_size rows, for whole-corpus jobs"""
+        return iter_collection(self.rag.collection, batch_size, include)
+
+    def embed_batch(self, texts, use_cache=True, batch_size=None):
+        """Embed many texts, running the model once per batch and only on cache misses"""
+        if self._embed is None:
+            raise RuntimeError("CommunityRAG does not expose its embedding model")
+        texts = list(texts)
+        batch_size = batch_size or self.batch_size
+
+        vectors = [None] * len(texts)
+        keys = [EmbeddingCache.key(self.model_name, text) for text in texts]
+        if use_cache:
+            cached = self.embedding_cache.get_many(keys)
+            for i, key in enumerate(keys):
+                vectors[i] = cached.get(key)
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            for i, vector in zip(batch, self._embed([texts[i] for i in batch])):
+                vectors[i] = vector
+            if use_cache:
+                self.embedding_cache.put_many((keys[i], vectors[i]) for i in batch)
+        return vectors
+
+    def _format_results(self, query, raw, row=0):
+        """Shape one row of a collection.query() response like CommunityRAG.query_knowledge_base"""
+        similarity = SPACE_SIMILARITY[self._space()]
+        results = []
+        for doc_id, content, metadata, distance in zip(raw['ids'][row], raw['documents'][row],
+                                                       raw['metadatas'][row], raw['distances'][row]):
+            results.append({'id': doc_id, 'content': content, 'metadata': metadata,
+                            'similarity': float(similarity(distance))})
+        return {'query': query, 'results': results}
+
+    def lexical_index(self):
+        """The BM25 index for the current collection version, built on first use"""
+        version = self.collection_version()
+        if self._lexical_version != version:
+            with self._lexical_lock:
+                if self._lexical_version != version:
+                    self._lexical = LexicalIndex.from_collection(self.rag.collection)
+                    self._lexical_version = version
+        return self._lexical
+
+    def _vector_index_fresh(self):
+        if self.vector_index is None:
+            return False
+        manifest = self.vector_index.manifest
+        name, count, fingerprint = self.collection_version()
+        if manifest.get('source') is not None:
+            return manifest['source'] == fingerprint and manifest['count'] == count
+        # Built without a fingerprint (QuantizedVectorIndex.build): only the row count can be compared
+        return manifest.get('collection_version') == [name, count]
+
+    def _index_search(self, queries, embeddings, n_results):
+        """Answers from the vector index, with every hit's document fetched in one get()"""
+        hits = [self.vector_index.search(embedding, n_results) for embedding in embeddings]
+        wanted = list(dict.fromkeys(doc_id for query_hits in hits for doc_id, _ in query_hits))
+        found = self.rag.collection.get(ids=wanted, include=['documents', 'metadatas'])
+        records = {doc_id: (content, metadata)
+                   for doc_id, content, metadata in zip(found['ids'], found['documents'], found['metadatas'])}
+        answers = []
+        for query, query_hits in zip(queries, hits):
+            results = []
+            for doc_id, similarity in query_hits:
+                if doc_id in records:
+                    content, metadata = records[doc_id]
+                    results.append({'id': doc_id, 'content': content, 'metadata': metadata,
+                                    'similarity': similarity})
+            answers.append({'query': query, 'results': results})
+        return answers
+
+    def _vector_search_many(self, queries, n_results):
+        """Direct-path answers for several queries: one embedding batch and one search"""
+        embeddings = self.embed_batch(queries)
+        if self._vector_index_fresh():
+            return self._index_search(queries, embeddings, n_results)
+        if self._space() != 'cosine':
+            embeddings = _normalize(embeddings).tolist()
+        raw = self.rag.collection.query(
+            query_embeddings=embeddings, n_results=n_results,
+            include=['documents', 'metadatas', 'distances']
+        )
+        return [self._format_results(query, raw, row) for row, query in enumerate(queries)]
+
+    def _vector_search(self, query, n_results):
+        if not self._direct_search():
+            return self.rag.query_knowledge_base(query, n_results=n_results)
+        return self._vector_search_many([query], n_results)[0]
+
+    def _lexical_search(self, query, n_results):
+        """BM25 only - no embedding; similarity is the score relative to the best hit"""
+        index = self.lexical_index()
+        hits = index.search(query, n_results)
+        best = hits[0][1] if hits else 1.0
+        return {'query': query, 'results': [index.result(position, score / best) for position, score in hits]}
+
+    def _cosine_similarities(self, embedding, ids):
+        """{id: cosine similarity to embedding} from the stored vectors of ids"""
+        found = self.rag.collection.get(ids=list(ids), include=['embeddings'])
+        vectors = np.asarray(found['embeddings'], dtype=np.float32).reshape(len(found['ids']), -1)
+        query = np.asarray(embedding, dtype=np.float32)
+        norms = np.maximum(np.linalg.norm(vectors, axis=1) * np.linalg.norm(query), 1e-12)
+        return dict(zip(found['ids'], (vectors @ query / norms).tolist()))
+
+    def _hybrid_search(self, query, n_results):
+        """Fuse vector and BM25 rankings over a wider candidate pool"""
+        pool = n_results * 3
+        vector = self._vector_search(query, pool)['results']
+        if any(r.get('id') is None for r in vector):
+            return {'query': query, 'results': vector[:n_results]}
+        lexical = self._lexical_search(query, pool)['results']
+        fused = reciprocal_rank_fusion([[r['id'] for r in vector], [r['id'] for r in lexical]])
+        ranked = sorted(fused, key=fused.get, reverse=True)[:n_results]
+
+        # BM25 scores are relative to the best hit; re-score hits only BM25 found as cosine
+        by_id = {r['id']: r for r in vector}
+        lexical_only = {r['id']: r for r in lexical if r['id'] in ranked and r['id'] not in by_id}
+        if lexical_only:
+            similarities = self._cosine_similarities(self.embed_batch([query])[0], lexical_only)
+            for doc_id, result in lexical_only.items():
+                if doc_id in similarities:
+                    by_id[doc_id] = {**result, 'similarity': similarities[doc_id]}
+        return {'query': query, 'results': [by_id[doc_id] for doc_id in ranked if doc_id in by_id]}
+
+    def _search(self, query, n_results, mode='auto'):
+        if mode == 'auto':
+            # A "quoted" query asks for exact terms: answer it lexically and skip embedding
+            stripped = query.strip()
+            if len(stripped) > 2 and stripped[0] == stripped[-1] == '"':
+                return self._lexical_search(stripped[1:-1], n_results)
+            mode = 'vector'
+        if mode == 'lexical':
+            return self._lexical_search(query, n_results)
+        if mode == 'hybrid':
+            return self._hybrid_search(query, n_results)
+        return self._vector_search(query, n_results)
+
+    def query_knowledge_base(self, query, n_results=5, mode='auto'):
+        """Search the knowledge base; mode is one of SEARCH_MODES"""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        key = (normalize_query(query), n_results, mode, self.reranker is not None)
+        version = self.collection_version()
+        results = self.cache.get(key, version)
+        if results is None and self.reranker is not None:
+            pool = self._search(query, max(n_results, self.reranker.candidates), mode)
+            ranked, complete = self.reranker.rerank(query, pool['results'], n_results)
+            results = {**pool, 'results': ranked}
+            self.cache.put(key, version, results, None if complete else self.reranker.fallback_ttl_seconds)
+        elif results is None:
+            results = self._search(query, n_results, mode)
+            self.cache.put(key, version, results)
+        return results
+
+    def query_many(self, queries, n_results=5):
+        """Answer several queries with one embedding batch and one search
+
+        Results come back in the same order as queries and match
+        query_knowledge_base(query, mode='vector'); cached answers are reused
+        and only the remaining queries are embedded and searched (against the
+        vector index when it is fresh, else in one collection.query call).
+        Without the direct path each query goes through CommunityRAG in turn.
+        """
+        queries = list(queries)
+        version = self.collection_version()
+        keys = [(normalize_query(query), n_results, 'vector', False) for query in queries]
+        answers = [self.cache.get(key, version) for key in keys]
+
+        missing = [i for i, answer in enumerate(answers) if answer is None]
+        if missing and not self._direct_search():
+            for i in missing:
+                answers[i] = self.rag.query_knowledge_base(queries[i], n_results=n_results)
+                self.cache.put(keys[i], version, answers[i])
+        elif missing:
+            for i, answer in zip(missing, self._vector_search_many([queries[i] for i in missing], n_results)):
+                answers[i] = answer
+                self.cache.put(keys[i], version, answer)
+        return answers
+
+    def add_documents(self, ids, documents, metadatas, batch_size=256):
+        """Ingest chunks with batched embedding and one upsert per batch"""
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            embeddings = self.embed_batch(documents[start:end], use_cache=False, batch_size=batch_size)
+            self.rag.collection.upsert(
+                ids=list(ids[start:end]), documents=list(documents[start:end]),
+                metadatas=list(metadatas[start:end]), embeddings=embeddings
+            )
+            if self.theme_index is not None:
+                self.theme_index.add_many(ids[start:end], documents[start:end], metadatas[start:end])
+        self._fingerprint = (0.0, None)
+        return len(ids)
+
+    def delete_documents(self, ids, batch_size=500):
+        """Remove chunks from the collection and the theme index"""
+        ids = list(ids)
+        for start in range(0, len(ids), batch_size):
+            self.rag.collection.delete(ids=ids[start:start + batch_size])
+            if self.theme_index is not None:
+                self.theme_index.remove_many(ids[start:start + batch_size])
+        self._fingerprint = (0.0, None)
+        return len(ids)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+🔤 COMMUNITY DATA COMMONS - LEXICAL INDEX
+In-process BM25 index over the community knowledge base
+"""
+
+import re
+import math
+from collections import Counter, defaultdict
+
+from vector_index import iter_collection
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have how i if in into is it its
+me my of on or our so than that the their them then there these they this to was we were what when where
+which who why will with would you your
+""".split())
+
+
+def tokenize(text):
+    """Lowercased word tokens with common English stopwords removed"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class LexicalIndex:
+    """BM25 inverted index over the documents of the community_knowledge collection
+
+    Names such as "Mungano" or "baraza" are matched exactly instead of by
+    embedding similarity, and a lexical search needs no embedding model at all.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self.lengths = []
+        self.average_length = 0.0
+
+    def add(self, ids, documents, metadatas):
+        for doc_id, document, metadata in zip(ids, documents, metadatas):
+            position = len(self.ids)
+            terms = tokenize(document)
+            for term, frequency in Counter(terms).items():
+                self.postings[term].append((position, frequency))
+            self.ids.append(doc_id)
+            self.documents.append(document)
+            self.metadatas.append(metadata)
+            self.lengths.append(len(terms))
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    @classmethod
+    def from_collection(cls, collection, batch_size=500):
+        """Build from a Chroma collection, reading it a page at a time"""
+        index = cls()
+        for page in iter_collection(collection, batch_size):
+            index.add(page['ids'], page['documents'], page['metadatas'])
+        return index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, n_results=5):
+        """[(position, bm25 score)] for the best matching documents, best first"""
+        total = len(self.ids)
+        if not total:
+            return []
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / (self.average_length or 1))
+                scores[position] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+
+    def result(self, position, similarity):
+        """A hit shaped like a CommunityRAG.query_knowledge_base result"""
+        return {
+            'id': self.ids[position],
+            'content': self.documents[position],
+            'metadata': self.metadatas[position],
+            'similarity': similarity
+        }
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse several ranked id lists into one {id: score}, higher is better"""
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] += 1.0 / (k + rank + 1)
+    return fused
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+🗺️ COMMUNITY DATA COMMONS - MAPPED KNOWLEDGE BASE
+Opens an exported, memory-mapped copy of the knowledge base without Chroma
+"""
+
+import sys
+import sqlite3
+import threading
+from pathlib import Path
+
+from ann_index import IVF_MIN_ROWS, IVFIndex, open_vector_index
+from embedding_backends import (DEFAULT_EMBEDDING_MODEL, PROBE_TEXT, backend_model_name, check_embedder,
+                                load_embedder, resolve_backend)
+from embedding_server import connect_embedder
+from vector_index import VECTOR_INDEX_DIR, QuantizedVectorIndex, build_from_collection
+
+# CommunityRAG's Chroma persist directory is vector-db/, next to the export
+CHROMA_DB_FILE = VECTOR_INDEX_DIR.parent / "chroma.sqlite3"
+
+sys.path.append('/home/yethatsjames/community-ai-workspace/scripts')
+
+
+class LazyModel:
+    """Embedding model that is only loaded when something actually needs embedding
+
+    model_name is the name the embedding cache was keyed with when the index
+    was exported, so cached query embeddings keep hitting without the model.
+    backend and threads go to embedding_backends.load_embedder; 'auto' runs
+    the ONNX export of source when there is one. expected (an export manifest
+    or embedder_reference()) is checked when the model loads: a backend that
+    doesn't reproduce it falls back to the stock model, and if that doesn't
+    either, encoding raises ValueError rather than searching in the wrong space.
+    """
+
+    def __init__(self, model_name, source=DEFAULT_EMBEDDING_MODEL, backend='auto', threads=None, expected=None):
+        self.backend = resolve_backend(backend, model_name=source)
+        self._name = model_name or source
+        self.model_name = backend_model_name(self._name, self.backend)
+        self.source = source
+        self.threads = threads
+        self.expected = expected
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def _load(self):
+        model = load_embedder(self.source, self.backend, self.threads)
+        if self.expected is None:
+            return model
+        try:
+            return check_embedder(model, self.expected)
+        except ValueError as e:
+            if self.backend == 'default':
+                raise
+            print(f"⚠️ {e} - using the stock {self.source} instead")
+        self.backend = 'default'
+        self.model_name = backend_model_name(self._name, self.backend)
+        return check_embedder(load_embedder(self.source, self.backend, self.threads), self.expected)
+
+    def encode(self, texts):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model.encode(list(texts))
+
+
+class MappedCollection:
+    """Read-only stand-in for the community_knowledge Chroma collection
+
+    Covers the calls the apps make - count(), get(), query() and metadata - on top of a
+    QuantizedVectorIndex with a records sidecar.
+    """
+
+    def __init__(self, index):
+        if not index.has_records:
+            raise ValueError(f"{index.index_dir} has no records sidecar; re-export it")
+        self.index = index
+        version = index.manifest.get('collection_version') or ['community_knowledge', len(index)]
+        self.name = version[0]
+        self._rows = None
+
+    @property
+    def metadata(self):
+        # Distances are 1 - cosine similarity, as in a cosine-space Chroma collection
+        return {'hnsw:space': 'cosine'}
+
+    @property
+    def fingerprint(self):
+        # A read-only snapshot: its version is the Chroma state it was exported from
+        return self.index.manifest.get('source') or ['export', self.name, len(self.index)]
+
+    def count(self):
+        return len(self.index)
+
+    def _row_of(self, doc_id):
+        if self._rows is None:
+            self._rows = {doc_id: row for row, doc_id in enumerate(self.index.ids)}
+        return self._rows.get(doc_id)
+
+    def _page(self, rows, include):
+        include = include or ['documents', 'metadatas']
+        records = self.index.records(rows)
+        page = {'ids': [record['id'] for record in records]}
+        if 'documents' in include:
+            page['documents'] = [record['document'] for record in records]
+        if 'metadatas' in include:
+            page['metadatas'] = [record['metadata'] for record in records]
+        if 'embeddings' in include:
+            page['embeddings'] = [self.index.vectors[row].tolist() for row in rows]
+        return page
+
+    def get(self, ids=None, include=None, limit=None, offset=0):
+        if ids is not None:
+            rows = [row for row in map(self._row_of, ids) if row is not None]
+        else:
+            end = len(self.index) if limit is None else min(len(self.index), offset + limit)
+            rows = list(range(offset, end))
+        return self._page(rows, include)
+
+    def query(self, query_embeddings, n_results=5, include=None):
+        include = include or ['documents', 'metadatas', 'distances']
+        response = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        for embedding in query_embeddings:
+            hits = self.index.search_rows(embedding, n_results)
+            page = self._page([row for row, _ in hits], include)
+            response['ids'].append(page['ids'])
+            response['documents'].append(page.get('documents'))
+            response['metadatas'].append(page.get('metadatas'))
+            response['distances'].append([1 - similarity for _, similarity in hits])
+        return response
+
+
+class MappedRAG:
+    """CommunityRAG look-alike over an exported index: opens in milliseconds
+
+    The export is a snapshot - re-run export_knowledge_base() after ingesting
+    new transcripts. Queries are embedded by the shared embedding server when
+    it is running; otherwise the model loads on the first query that isn't
+    already in the embedding cache.
+    """
+
+    def __init__(self, index_dir=VECTOR_INDEX_DIR, model=None):
+        self.index = index_dir if isinstance(index_dir, QuantizedVectorIndex) else open_vector_index(index_dir)
+        self.collection = MappedCollection(self.index)
+        manifest = self.index.manifest
+        self.model = model or verified_client(manifest) or LazyModel(manifest.get('model'), expected=manifest)
+
+    def query_knowledge_base(self, query, n_results=5):
+        raw = self.collection.query(query_embeddings=[self.model.encode([query])[0]], n_results=n_results)
+        results = [{'content': content, 'metadata': metadata, 'similarity': 1 - distance}
+                   for content, metadata, distance in zip(raw['documents'][0], raw['metadatas'][0],
+                                                          raw['distances'][0])]
+        return {'query': query, 'results': results}
+
+
+def embedder_reference(rag):
+    """{'model', 'dim', 'probe'} from the model rag embeds with, or None if it exposes none
+
+    The same keys export_knowledge_base() records in the manifest, so either
+    can be handed to check_embedder() / LazyModel(expected=...).
+    """
+    from embeddings import resolve_embedder
+    model_name, embed = resolve_embedder(rag)
+    if embed is None:
+        return None
+    probe = [float(value) for value in embed([PROBE_TEXT])[0]]
+    return {'model': model_name, 'dim': len(probe), 'probe': probe}
+
+
+def verified_client(expected):
+    """The shared embedding server's client if it reproduces expected's vectors, else None
+
+    Without a reference to compare against the server isn't trusted either.
+    """
+    client = connect_embedder()
+    if client is None or expected is None:
+        return None
+    try:
+        return check_embedder(client, expected)
+    except ValueError as e:
+        print(f"⚠️ Not using the embedding server: {e}")
+        return None
+
+
+def query_model(expected):
+    """What CommunityRAG should embed with: the shared server, a faster backend, or None for its own model
+
+    The faster backend is loaded and checked against expected here, so a
+    mismatch leaves CommunityRAG's own model in charge instead of failing
+    on the first query or ingest.
+    """
+    if expected is None:
+        return None
+    client = verified_client(expected)
+    if client is not None:
+        return client
+    if resolve_backend() == 'default':
+        return None
+    model = LazyModel(None)
+    try:
+        return check_embedder(model, expected)
+    except (ImportError, OSError, ValueError) as e:
+        print(f"⚠️ Not using the {model.backend} embedding backend: {e}")
+        return None
+
+
+def chroma_fingerprint(db_file=CHROMA_DB_FILE):
+    """A value that changes whenever Chroma writes to its database, read without opening Chroma
+
+    Chroma records the last write sequence number it applied per segment in
+    max_seq_id; if that table isn't there (other Chroma versions) the file's
+    size and modification time stand in. None if there is no database.
+    """
+    db_file = Path(db_file)
+    if not db_file.exists():
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True, timeout=5)
+        try:
+            rows = conn.execute("SELECT segment_id, seq_id FROM max_seq_id ORDER BY segment_id").fetchall()
+        finally:
+            conn.close()
+        return ['max_seq_id'] + [[str(segment), seq.hex() if isinstance(seq, bytes) else seq] for segment, seq in rows]
+    except sqlite3.Error:
+        stat = db_file.stat()
+        return ['file', stat.st_size, stat.st_mtime_ns]
+
+
+def export_is_current(index, db_file=CHROMA_DB_FILE):
+    """True if the export was taken from the Chroma database as it is now"""
+    source = index.manifest.get('source')
+    return source is not None and source == chroma_fingerprint(db_file)
+
+
+def export_knowledge_base(rag, index_dir=VECTOR_INDEX_DIR, quantization='int8', nlist=None, db_file=CHROMA_DB_FILE):
+    """Export CommunityRAG's collection, documents and metadata for MappedRAG
+
+    Collections of IVF_MIN_ROWS chunks or more also get an IVF partition with
+    nlist lists (about sqrt(n) by default) for approximate search. The Chroma
+    fingerprint is taken before reading, so writes during the export leave it
+    marked stale rather than current. The exporting model's probe vector goes
+    in the manifest too, so query-time models can be checked against it.
+    """
+    source = chroma_fingerprint(db_file)
+    reference = embedder_reference(rag) or {}
+    index = build_from_collection(rag.collection, index_dir, quantization, model=reference.get('model'),
+                                  extra={'source': source, 'probe': reference.get('probe')})
+    if len(index) >= IVF_MIN_ROWS:
+        index = IVFIndex.train(index_dir, nlist)
+    return index
+
+
+def open_knowledge_base(index_dir=VECTOR_INDEX_DIR, backend='auto', db_file=CHROMA_DB_FILE):
+    """A CachedKnowledgeBase over the mapped export if it is current, else over CommunityRAG
+
+    backend picks the vector search: 'flat', 'ivf' or 'auto' (see ann_index).
+    An export whose Chroma fingerprint no longer matches the database (chunks
+    were ingested or deleted since) is not used at all until it is re-exported.
+    """
+    from knowledge_base import CachedKnowledgeBase
+    from theme_index import ThemeIndex
+    try:
+        index = open_vector_index(index_dir, backend)
+    except FileNotFoundError:
+        index = None
+    if index is not None and not export_is_current(index, db_file):
+        print(f"⚠️ {index_dir} is older than the Chroma collection - serving CommunityRAG; "
+              f"re-run export_knowledge_base() to get the fast path back")
+        index = None
+    if index is not None and index.has_records:
+        return CachedKnowledgeBase(MappedRAG(index), vector_index=index, theme_index=ThemeIndex())
+    from privacy_rag import CommunityRAG
+    rag = CommunityRAG()
+    # Only swap CommunityRAG's own model out for one that reproduces its vectors
+    return CachedKnowledgeBase(rag, vector_index=index, model=query_model(embedder_reference(rag)),
+                               theme_index=ThemeIndex(), db_file=db_file)
+
+
+COLD_START_CHROMA = """
+import sys, time, json
+start = time.perf_counter()
+sys.path.append('/home/yethatsjames/community-ai-workspace/scripts')
+from privacy_rag import CommunityRAG
+rag = CommunityRAG()
+opened = time.perf_counter()
+rag.collection.query(query_embeddings=[json.loads(sys.argv[1])], n_results=5)
+print(json.dumps([opened - start, time.perf_counter() - start]))
+"""
+
+COLD_START_MAPPED = """
+import sys, time, json
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[2])
+from mapped_rag import MappedRAG
+rag = MappedRAG(sys.argv[3])
+opened = time.perf_counter()
+rag.collection.query(query_embeddings=[json.loads(sys.argv[1])], n_results=5)
+print(json.dumps([opened - start, time.perf_counter() - start]))
+"""
+
+
+def _cold_start(script, *args, runs=5):
+    """Median (open, first result) seconds over fresh interpreters, or None if it can't run"""
+    import json
+    import statistics
+    import subprocess
+    timings = []
+    for _ in range(runs):
+        done = subprocess.run([sys.executable, '-c', script, *args], capture_output=True, text=True)
+        if done.returncode != 0:
+            return None
+        timings.append(json.loads(done.stdout.strip().splitlines()[-1]))
+    return tuple(statistics.median(column) for column in zip(*timings))
+
+
+if __name__ == "__main__":
+    # Benchmark: time-to-first-result from a fresh process, Chroma vs the mapped export.
+    # The query is pre-embedded so model loading (the same for both) isn't counted.
+    import json
+    import tempfile
+    from vector_index import _synthetic_corpus
+
+    with tempfile.TemporaryDirectory() as scratch:
+        index_dir = VECTOR_INDEX_DIR
+        if not (index_dir / "records.offsets").exists():
+            n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+            index_dir = Path(scratch) / "flat-index"
+            vectors = _synthetic_corpus(n, 384)
+            ids = [f"chunk_{i}" for i in range(n)]
+            QuantizedVectorIndex.build(index_dir, ids, vectors, documents=[f"Community insight {i}" for i in ids],
+                                       metadatas=[{'community': 'Kibera'} for _ in ids],
+                                       collection_version=['community_knowledge', n])
+        index = QuantizedVectorIndex(index_dir)
+        probe = json.dumps(index.vectors[0].tolist())
+
+        print("🗺️ COLD START BENCHMARK")
+        print("=" * 50)
+        print(f"📦 {len(index):,} chunks x {index.manifest['dim']} dims from {index_dir}")
+        here = str(Path(__file__).resolve().parent)
+        for label, script, args in (("Chroma (CommunityRAG)", COLD_START_CHROMA, [probe]),
+                                    ("Mapped export", COLD_START_MAPPED, [probe, here, str(index_dir)])):
+            timing = _cold_start(script, *args)
+            if timing is None:
+                print(f"⏭️ {label:22s} skipped (could not start)")
+            else:
+                print(f"⚡ {label:22s} open {timing[0] * 1000:8.1f} ms, first result {timing[1] * 1000:8.1f} ms")
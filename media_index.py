@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+🖼️ COMMUNITY DATA COMMONS - MEDIA INDEX
+Persistent file_id lookup for uploaded media and thumbnails
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+WORKSPACE_PATH = Path("/home/yethatsjames/community-ai-workspace")
+MEDIA_INDEX_FILE = WORKSPACE_PATH / "contributions" / "media_index.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    file_id TEXT PRIMARY KEY,
+    file_type TEXT,
+    thumbnail_file TEXT,
+    metadata TEXT NOT NULL
+);
+"""
+
+
+class MediaIndex:
+    """file_id -> media metadata (including thumbnail) without listing the upload directory
+
+    Entries are recorded when an upload is saved and updated when processing
+    produces a thumbnail. get_many() resolves a whole page of contribution
+    cards in a single query.
+    """
+
+    def __init__(self, db_path=MEDIA_INDEX_FILE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def record(self, file_id, metadata):
+        """Add or replace the metadata for an uploaded file"""
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?)",
+                (file_id, metadata.get('file_type'), metadata.get('thumbnail_file'), json.dumps(metadata))
+            )
+
+    def set_thumbnail(self, file_id, thumbnail_file):
+        """Attach the thumbnail produced by image processing"""
+        conn = self._connection()
+        with conn:
+            updated = conn.execute(
+                "UPDATE media SET thumbnail_file = ? WHERE file_id = ?", (thumbnail_file, file_id)
+            ).rowcount
+            if not updated:
+                conn.execute(
+                    "INSERT INTO media VALUES (?, NULL, ?, ?)",
+                    (file_id, thumbnail_file, json.dumps({'file_id': file_id}))
+                )
+
+    def _entry(self, row):
+        file_id, file_type, thumbnail_file, metadata = row
+        entry = json.loads(metadata)
+        entry['file_id'] = file_id
+        if thumbnail_file:
+            entry['thumbnail_file'] = thumbnail_file
+        return entry
+
+    def get(self, file_id):
+        return self.get_many([file_id]).get(file_id)
+
+    def get_many(self, file_ids):
+        """Batch lookup: {file_id: metadata} for every indexed file_id"""
+        file_ids = [f for f in set(file_ids) if f]
+        if not file_ids:
+            return {}
+        placeholders = ','.join('?' * len(file_ids))
+        rows = self._connection().execute(
+            f"SELECT file_id, file_type, thumbnail_file, metadata FROM media WHERE file_id IN ({placeholders})",
+            file_ids
+        )
+        return {row[0]: self._entry(row) for row in rows}
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM media").fetchone()[0]
+
+    def rebuild(self, uploaded_files):
+        """Backfill from MediaProcessor.list_uploaded_files() for uploads made before the index"""
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?)",
+                ((f['file_id'], f.get('file_type'), f.get('thumbnail_file'), json.dumps(f))
+                 for f in uploaded_files if f.get('file_id'))
+            )
+        return self.count()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+🎯 COMMUNITY DATA COMMONS - RE-RANKER
+Cross-encoder re-scoring of retrieved chunks under a per-query time budget
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+DEFAULT_RERANK_MODEL = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+
+
+class RerankStats:
+    """Counts of how each query left the re-ranker, plus recent scoring latencies"""
+
+    OUTCOMES = ('reranked', 'over_budget', 'cold', 'error')
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(self.OUTCOMES, 0)
+        self.latencies = deque(maxlen=window)
+
+    def record(self, outcome, seconds=None):
+        with self._lock:
+            self.counts[outcome] += 1
+            if seconds is not None:
+                self.latencies.append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self.counts)
+            latencies = sorted(self.latencies)
+        queries = sum(counts.values())
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+
+        return {**counts, 'queries': queries,
+                'budget_hit_rate': counts['over_budget'] / queries if queries else 0.0,
+                'fallback_rate': (queries - counts['reranked']) / queries if queries else 0.0,
+                'p50_ms': percentile(0.5), 'p95_ms': percentile(0.95)}
+
+
+class CrossEncoderReranker:
+    """Re-orders search results with a small cross-encoder, never slower than budget_ms
+
+    The knowledge base retrieves `candidates` chunks, and the cross-encoder
+    scores each (query, chunk) pair on a worker thread. If scoring isn't done
+    within budget_ms the caller gets the retrieval order straight away, and
+    the worker stops at its next batch - keep batch_size small so an abandoned
+    query doesn't eat into the next one's budget. While the model is still
+    loading (in the background, on first use), queries fall back the same way.
+    stats.snapshot() reports how often each of those happened.
+
+    Scoring 20 candidates with a MiniLM-L6 cross-encoder takes well over
+    150 ms on a small CPU, so most queries would pay the full budget and then
+    fall back; re-ranking is therefore opt-in (engine_registry.RERANK_INSIGHTS).
+    Run `python reranker.py` on the target machine before enabling it and
+    pick budget_ms / candidates from its p95.
+    """
+
+    def __init__(self, model_name=DEFAULT_RERANK_MODEL, budget_ms=150, candidates=20, batch_size=4, threads=None,
+                 model=None, fallback_ttl_seconds=30):
+        self.model_name = model_name
+        self.budget = budget_ms / 1000
+        self.candidates = candidates
+        self.fallback_ttl_seconds = fallback_ttl_seconds
+        self.batch_size = batch_size
+        self.threads = threads
+        self.model = model
+        self.load_error = None
+        self._loader = None
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+        self.stats = RerankStats()
+
+    def _load(self):
+        try:
+            from sentence_transformers import CrossEncoder
+            if self.threads:
+                import torch
+                torch.set_num_threads(self.threads)
+            self.model = CrossEncoder(self.model_name, device='cpu')
+        except Exception as e:
+            self.load_error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Re-ranker unavailable, keeping vector order: {self.load_error}")
+
+    def warm_up(self):
+        """Start loading the cross-encoder in the background"""
+        with self._lock:
+            if self.model is None and self._loader is None:
+                self._loader = threading.Thread(target=self._load, name="reranker-load", daemon=True)
+                self._loader.start()
+        return self._loader
+
+    @property
+    def ready(self):
+        return self.model is not None
+
+    def _score(self, query, documents, cancelled):
+        scores = []
+        for start in range(0, len(documents), self.batch_size):
+            if cancelled.is_set():
+                return None
+            pairs = [(query, document) for document in documents[start:start + self.batch_size]]
+            scores.extend(float(score) for score in self.model.predict(pairs))
+        return scores
+
+    def rerank(self, query, results, n_results):
+        """(top n_results, True) re-ordered by the cross-encoder, or (retrieval order, False)"""
+        if len(results) <= 1:
+            return results[:n_results], True
+        if not self.ready:
+            self.warm_up()
+            self.stats.record('error' if self.load_error else 'cold')
+            return results[:n_results], False
+
+        start = time.perf_counter()
+        cancelled = threading.Event()
+        future = self._pool.submit(self._score, query, [r['content'] for r in results], cancelled)
+        try:
+            scores = future.result(timeout=self.budget)
+        except FutureTimeout:
+            cancelled.set()
+            self.stats.record('over_budget', time.perf_counter() - start)
+            return results[:n_results], False
+        except Exception as e:
+            print(f"⚠️ Re-ranking failed, keeping vector order: {e}")
+            self.stats.record('error')
+            return results[:n_results], False
+        self.stats.record('reranked', time.perf_counter() - start)
+
+        order = sorted(range(len(results)), key=lambda i: scores[i], reverse=True)[:n_results]
+        return [{**results[i], 'rerank_score': scores[i]} for i in order], True
+
+
+def load_reranker(**options):
+    """A CrossEncoderReranker warming up in the background, or None without sentence-transformers"""
+    import importlib.util
+    if importlib.util.find_spec('sentence_transformers') is None:
+        return None
+    reranker = CrossEncoderReranker(**options)
+    reranker.warm_up()
+    return reranker
+
+
+if __name__ == "__main__":
+    # Benchmark: re-rank latency and budget hits for candidate pools of different sizes
+    # usage: python reranker.py [budget_ms] [model]
+    import sys
+    from embedding_backends import SAMPLE_SENTENCES
+
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 150
+    model_name = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_RERANK_MODEL
+    questions = ["How do youth organize clean-ups?", "What skills training exists for women?",
+                 "How do savings groups start enterprises?", "What stops communities organizing?"]
+
+    print("🎯 CROSS-ENCODER RE-RANK BENCHMARK")
+    print("=" * 50)
+    for candidates in (10, 20, 40):
+        reranker = CrossEncoderReranker(model_name, budget_ms=budget_ms, candidates=candidates)
+        reranker.warm_up().join()
+        if not reranker.ready:
+            sys.exit(1)
+        pool = [{'content': SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)] * (1 + i % 3), 'similarity': 1 - i / 100}
+                for i in range(candidates)]
+        start = time.perf_counter()
+        for question in questions:
+            reranker._score(question, [r['content'] for r in pool], threading.Event())
+        unbounded_ms = (time.perf_counter() - start) * 1000 / len(questions)
+        for _ in range(5):
+            for question in questions:
+                reranker.rerank(question, pool, 5)
+        stats = reranker.stats.snapshot()
+        print(f"⚡ {candidates:3d} candidates: full scoring {unbounded_ms:7.1f} ms; with {budget_ms:.0f} ms budget "
+              f"p50 {stats['p50_ms']:7.1f} ms, p95 {stats['p95_ms']:7.1f} ms, over budget {stats['budget_hit_rate']:.0%}")
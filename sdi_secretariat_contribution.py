@@ -203,19 +203,11 @@ if pathway['title'] == '🏛️ The Role of the SDI Secretariat':
 
 
 def save_sdi_contribution():
-    """Save SDI Secretariat contribution to the community contributions file"""
+    """Save SDI Secretariat contribution to the community contributions store"""
     
-    import json
-    from pathlib import Path
     from datetime import datetime
-    
-    # Load existing contributions
-    contributions_file = Path("/home/yethatsjames/community-ai-workspace/community_contributions.json")
-    if contributions_file.exists():
-        with open(contributions_file, 'r') as f:
-            contributions = json.load(f)
-    else:
-        contributions = []
+    from contribution_store import ContributionStore
+    from contribution_index import ContributionRepository
     
     # Add SDI Secretariat foundational entry
     sdi_entry = get_sdi_secretariat_entry()
@@ -232,12 +224,8 @@ def save_sdi_contribution():
         'version': '1.0'
     }
     
-    # Insert as first entry (foundational)
-    contributions.insert(0, sdi_contribution)
-    
-    # Save updated contributions
-    with open(contributions_file, 'w') as f:
-        json.dump(contributions, f, indent=2)
+    # Append to the journal (the dashboards order contributions by timestamp)
+    ContributionStore(repository=ContributionRepository()).append(sdi_contribution)
     
     return sdi_contribution
 
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+🎯 COMMUNITY DATA COMMONS - THEME COUNTER
+Counts theme keywords across the knowledge base in one pass per document
+"""
+
+from collections import Counter
+
+THEMES = {
+    'Youth Empowerment': ['youth', 'young people', 'skills', 'training'],
+    'Government Engagement': ['government', 'offices', 'baraza', 'leaders'],
+    'Community Organizing': ['community', 'organizing', 'members', 'programs'],
+    'Media & Storytelling': ['media', 'stories', 'narrative', 'voices'],
+    'Economic Development': ['finance', 'loans', 'unemployment', 'opportunities']
+}
+
+# Measured crossover: fewer keywords than this are faster as separate C substring searches
+AUTOMATON_MIN_KEYWORDS = 32
+
+
+class ThemeMatcher:
+    """Finds every theme keyword in one pass over each lowercased document
+
+    A theme's mentions in a document are the number of its keywords that
+    appear anywhere in the lowercased text (substring match), summed over
+    documents - the same numbers the original theme-by-theme scan gave, but
+    each document is lowercased once and each keyword checked once, however
+    many themes share it.
+
+    With pyahocorasick installed and AUTOMATON_MIN_KEYWORDS or more keywords,
+    all keywords are matched in a single Aho-Corasick pass whose cost doesn't
+    grow with the keyword count. Below that, CPython's C substring search per
+    keyword is faster than walking an automaton, so that is used instead.
+    """
+
+    def __init__(self, themes=THEMES):
+        self.themes = {theme: [k.lower() for k in keywords] for theme, keywords in themes.items()}
+        self.keywords = sorted({k for ks in self.themes.values() for k in ks})
+        self.keyword_themes = {k: [theme for theme, ks in self.themes.items() if k in ks] for k in self.keywords}
+        self.automaton = None
+        if len(self.keywords) >= AUTOMATON_MIN_KEYWORDS:
+            try:
+                import ahocorasick
+            except ImportError:
+                pass
+            else:
+                self.automaton = ahocorasick.Automaton()
+                for keyword in self.keywords:
+                    self.automaton.add_word(keyword, keyword)
+                self.automaton.make_automaton()
+
+    def keywords_in(self, text):
+        """Every keyword that occurs in text"""
+        text = text.lower()
+        if self.automaton is not None:
+            return {keyword for _, keyword in self.automaton.iter(text)}
+        return {keyword for keyword in self.keywords if keyword in text}
+
+    def theme_mentions(self, text):
+        """Counter of theme -> number of its keywords present in text"""
+        mentions = Counter()
+        for keyword in self.keywords_in(text):
+            for theme in self.keyword_themes[keyword]:
+                mentions[theme] += 1
+        return mentions
+
+    def count(self, documents):
+        """{theme: mentions} over all documents, every theme present (0 if unmentioned)"""
+        keyword_counts = Counter()
+        for document in documents:
+            keyword_counts.update(self.keywords_in(document))
+        totals = dict.fromkeys(self.themes, 0)
+        for keyword, count in keyword_counts.items():
+            for theme in self.keyword_themes[keyword]:
+                totals[theme] += count
+        return totals
+
+
+def count_themes_naive(documents, themes=THEMES):
+    """The original per-theme, per-keyword scan, kept as the benchmark baseline"""
+    theme_counts = {}
+    for theme_name, keywords in themes.items():
+        count = 0
+        for doc in documents:
+            doc_lower = doc.lower()
+            count += sum(1 for keyword in keywords if keyword in doc_lower)
+        theme_counts[theme_name] = count
+    return theme_counts
+
+
+def synthetic_documents(n, seed=5):
+    """Transcript-like chunks of 40-200 words, with theme keywords sprinkled in"""
+    import random
+    rng = random.Random(seed)
+    filler = ("we met with the neighbours about water and rent and the school fees so that people in the "
+              "settlement could plan together for the coming season and share what worked before").split()
+    keywords = [k for ks in THEMES.values() for k in ks] + ['loans', 'Baraza', 'Youth', 'upskills']
+    documents = []
+    for _ in range(n):
+        words = [rng.choice(filler) for _ in range(rng.randint(40, 200))]
+        for _ in range(rng.randint(0, 6)):
+            words.insert(rng.randrange(len(words)), rng.choice(keywords))
+        documents.append(' '.join(words))
+    return documents
+
+
+def expanded_themes(keywords_per_theme, seed=1):
+    """THEMES padded with made-up keywords, to see how matching scales with theme lists"""
+    import random
+    rng = random.Random(seed)
+    return {theme: keywords + [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(5, 10)))
+                               for _ in range(keywords_per_theme - len(keywords))]
+            for theme, keywords in THEMES.items()}
+
+
+if __name__ == "__main__":
+    # Benchmark: theme-by-theme scan vs ThemeMatcher on a synthetic corpus, growing the keyword lists
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    documents = synthetic_documents(n)
+
+    print("🎯 THEME COUNTER BENCHMARK")
+    print("=" * 50)
+    print(f"📝 {n:,} documents, {sum(len(d) for d in documents) / 2**20:.1f} MB of text")
+
+    for per_theme in (4, 16, 32):
+        themes = THEMES if per_theme == 4 else expanded_themes(per_theme)
+        start = time.perf_counter()
+        expected = count_themes_naive(documents, themes)
+        naive = time.perf_counter() - start
+
+        matcher = ThemeMatcher(themes)
+        start = time.perf_counter()
+        counted = matcher.count(documents)
+        single = time.perf_counter() - start
+        method = 'aho-corasick' if matcher.automaton is not None else 'substring'
+        print(f"⚡ {len(matcher.keywords):3d} keywords: theme-by-theme {naive:6.2f}s, matcher ({method}) "
+              f"{single:6.2f}s, {naive / single:4.1f}x, {'identical' if counted == expected else 'DIFFERENT'} counts")
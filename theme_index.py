@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+🏷️ COMMUNITY DATA COMMONS - THEME INDEX
+Ingest-time theme tags and community counts for the analytics page
+"""
+
+import json
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+
+from theme_counter import THEMES, ThemeMatcher
+from vector_index import iter_collection
+
+WORKSPACE_PATH = Path("/home/yethatsjames/community-ai-workspace")
+THEME_INDEX_FILE = WORKSPACE_PATH / "vector-db" / "theme_index.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id TEXT PRIMARY KEY,
+    community TEXT NOT NULL,
+    theme_mask INTEGER NOT NULL,
+    keyword_mask INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS community_counts (
+    community TEXT PRIMARY KEY,
+    chunks INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS theme_counts (
+    theme TEXT PRIMARY KEY,
+    mentions INTEGER NOT NULL,
+    chunks INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _bits(mask):
+    return bin(mask).count('1')
+
+
+class ThemeIndex:
+    """Per-chunk theme bitmasks plus running community and theme counters
+
+    Each chunk is matched once, when it is ingested: one bit per keyword it
+    contains and one bit per theme it touches, stored with its community. The
+    counters are updated in the same transaction (re-ingesting a chunk first
+    takes its old contribution back out), so the analytics page reads a
+    handful of rows instead of every document. Editing THEMES changes the
+    keyword signature, which empties the index until the next sync().
+    """
+
+    def __init__(self, db_path=THEME_INDEX_FILE, themes=THEMES):
+        self.matcher = ThemeMatcher(themes)
+        if len(self.matcher.keywords) > 63:
+            raise ValueError("ThemeIndex keeps keywords in a 63-bit mask; split the themes")
+        self.theme_names = list(self.matcher.themes)
+        self.keyword_bits = {keyword: 1 << i for i, keyword in enumerate(self.matcher.keywords)}
+        self.theme_keyword_masks = {
+            theme: sum(self.keyword_bits[k] for k in set(keywords)) for theme, keywords in self.matcher.themes.items()
+        }
+
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._check_signature()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def _check_signature(self):
+        signature = json.dumps(self.matcher.themes, sort_keys=True)
+        conn = self._connection()
+        row = conn.execute("SELECT value FROM meta WHERE key = 'themes'").fetchone()
+        if row is None or row[0] != signature:
+            with conn:
+                self._clear(conn)
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('themes', ?)", (signature,))
+
+    @staticmethod
+    def _clear(conn):
+        conn.execute("DELETE FROM chunks")
+        conn.execute("DELETE FROM community_counts")
+        conn.execute("DELETE FROM theme_counts")
+
+    def _contribution(self, keyword_mask):
+        """(theme_mask, {theme: mentions}) for one chunk's keyword mask"""
+        theme_mask = 0
+        mentions = {}
+        for bit, theme in enumerate(self.theme_names):
+            found = _bits(keyword_mask & self.theme_keyword_masks[theme])
+            if found:
+                theme_mask |= 1 << bit
+                mentions[theme] = found
+        return theme_mask, mentions
+
+    def add_many(self, ids, documents, metadatas):
+        """Tag and count chunks as they are ingested; ids already indexed are replaced"""
+        latest = {}
+        for doc_id, document, metadata in zip(ids, documents, metadatas):
+            keyword_mask = sum(self.keyword_bits[k] for k in self.matcher.keywords_in(document or ''))
+            latest[doc_id] = ((metadata or {}).get('community') or 'Unknown', keyword_mask)
+        if not latest:
+            return 0
+
+        deltas = (Counter(), Counter(), Counter())
+        conn = self._connection()
+        with conn:
+            self._uncount(conn, list(latest), deltas)
+            rows = []
+            for doc_id, (community, keyword_mask) in latest.items():
+                rows.append((doc_id, community, self._count(deltas, community, keyword_mask, 1), keyword_mask))
+            conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)", rows)
+            self._apply(conn, deltas)
+        return len(latest)
+
+    def remove_many(self, ids):
+        """Take deleted chunks back out of the index and its counters"""
+        ids = list(dict.fromkeys(ids))
+        deltas = (Counter(), Counter(), Counter())
+        conn = self._connection()
+        with conn:
+            self._uncount(conn, ids, deltas)
+            conn.executemany("DELETE FROM chunks WHERE id = ?", [(doc_id,) for doc_id in ids])
+            self._apply(conn, deltas)
+        return len(ids)
+
+    def _count(self, deltas, community, keyword_mask, sign):
+        communities, mentions, theme_chunks = deltas
+        theme_mask, found_by_theme = self._contribution(keyword_mask)
+        communities[community] += sign
+        for theme, found in found_by_theme.items():
+            mentions[theme] += sign * found
+            theme_chunks[theme] += sign
+        return theme_mask
+
+    def _uncount(self, conn, ids, deltas):
+        """Subtract what the already indexed ids among ids contributed"""
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for community, keyword_mask in conn.execute(
+                    f"SELECT community, keyword_mask FROM chunks WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk):
+                self._count(deltas, community, keyword_mask, -1)
+
+    @staticmethod
+    def _apply(conn, deltas):
+        communities, mentions, theme_chunks = deltas
+        conn.executemany(
+            "INSERT INTO community_counts VALUES (?, ?) "
+            "ON CONFLICT(community) DO UPDATE SET chunks = chunks + excluded.chunks",
+            [(community, delta) for community, delta in communities.items() if delta])
+        conn.execute("DELETE FROM community_counts WHERE chunks <= 0")
+        conn.executemany(
+            "INSERT INTO theme_counts VALUES (?, ?, ?) ON CONFLICT(theme) DO UPDATE SET "
+            "mentions = mentions + excluded.mentions, chunks = chunks + excluded.chunks",
+            [(theme, mentions[theme], theme_chunks[theme]) for theme in set(mentions) | set(theme_chunks)])
+
+    def rebuild(self, collection, batch_size=500):
+        """Re-tag every chunk of a collection, reading it a page at a time"""
+        conn = self._connection()
+        with conn:
+            self._clear(conn)
+        for page in iter_collection(collection, batch_size):
+            self.add_many(page['ids'], page['documents'], page['metadatas'])
+        return self.count()
+
+    def sync(self, collection):
+        """Rebuild if the collection holds a different number of chunks (e.g. ingested elsewhere)"""
+        if self.count() != collection.count():
+            self.rebuild(collection)
+            return True
+        return False
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def community_counts(self):
+        """{community: chunks}, largest first"""
+        rows = self._connection().execute(
+            "SELECT community, chunks FROM community_counts ORDER BY chunks DESC, community")
+        return dict(rows.fetchall())
+
+    def theme_counts(self):
+        """{theme: keyword mentions}, every theme present"""
+        counts = dict.fromkeys(self.theme_names, 0)
+        counts.update(self._connection().execute("SELECT theme, mentions FROM theme_counts").fetchall())
+        return counts
+
+    def ids_with_theme(self, theme, limit=100):
+        """Chunk ids tagged with a theme"""
+        bit = 1 << self.theme_names.index(theme)
+        rows = self._connection().execute(
+            "SELECT id FROM chunks WHERE theme_mask & ? LIMIT ?", (bit, limit))
+        return [doc_id for (doc_id,) in rows]
+
+
+if __name__ == "__main__":
+    # Benchmark: analytics from the side index vs counting over the full collection
+    import sys
+    import time
+    import tempfile
+    from theme_counter import synthetic_documents
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    documents = synthetic_documents(n)
+    ids = [f"chunk_{i}" for i in range(n)]
+    metadatas = [{'community': ('Kibera', 'Mathare', 'Mukuru', 'Korogocho')[i % 4]} for i in range(n)]
+
+    print("🏷️ THEME INDEX BENCHMARK")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = ThemeIndex(Path(index_dir) / "theme_index.db")
+        start = time.perf_counter()
+        for i in range(0, n, 256):
+            index.add_many(ids[i:i + 256], documents[i:i + 256], metadatas[i:i + 256])
+        ingest = time.perf_counter() - start
+        print(f"📥 tagged {n:,} chunks at ingest in {ingest:.2f}s ({n / ingest:,.0f} chunks/sec)")
+
+        start = time.perf_counter()
+        communities = Counter(m['community'] for m in metadatas)
+        themes = ThemeMatcher().count(documents)
+        full = time.perf_counter() - start
+        print(f"🐢 counting over every document: {full * 1000:9.1f} ms (text already in memory)")
+
+        start = time.perf_counter()
+        indexed = (index.community_counts(), index.theme_counts())
+        served = time.perf_counter() - start
+        print(f"⚡ served from the side index:   {served * 1000:9.1f} ms, "
+              f"{'identical' if indexed == (dict(communities), themes) else 'DIFFERENT'} counts")